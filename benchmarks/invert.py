@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# Cost of inverting icon pixels for dark themes, per megapixel: the
+# original per-pixel loop against imaging.invert_pixels (bytes.translate).
+# Runs on synthetic buffers, so it needs neither GdkPixbuf nor a display.
+#
+#   python3 benchmarks/invert.py [--size 1000] [--legacy-size 300]
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from clockout import imaging
+
+# (name, channels, has_alpha, rowstride padding in bytes)
+LAYOUTS = [
+    ("rgba", 4, True, 0),
+    ("rgb", 3, False, 0),
+    ("rgb_padded", 3, False, 3),
+]
+
+
+def legacy_invert(pixels, width, height, rowstride, n_channels):
+    # invert_pixbuf before the lookup table, minus the GdkPixbuf wrapping
+    pixels = bytearray(pixels)
+    for y in range(height):
+        for x in range(width):
+            offset = y * rowstride + x * n_channels
+            if offset + 2 < len(pixels):
+                pixels[offset] = 255 - pixels[offset]
+                pixels[offset + 1] = 255 - pixels[offset + 1]
+                pixels[offset + 2] = 255 - pixels[offset + 2]
+    return pixels
+
+
+def make_buffer(size, n_channels, padding):
+    rowstride = size * n_channels + padding
+    # GdkPixbuf leaves the last row unpadded
+    length = rowstride * (size - 1) + size * n_channels
+    return random.Random(size).randbytes(length), rowstride
+
+
+def ms_per_megapixel(function, size, repeats):
+    return min(timeit.repeat(function, number=1, repeat=repeats)) * 1000 / (size * size / 1e6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dark theme pixel inversion.")
+    parser.add_argument("--size", type=int, default=1000, help="image edge for the lookup table path")
+    parser.add_argument("--legacy-size", type=int, default=300, help="image edge for the old loop (slow)")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for name, n_channels, has_alpha, padding in LAYOUTS:
+        # Both paths have to agree byte for byte
+        pixels, rowstride = make_buffer(args.legacy_size, n_channels, padding)
+        expected = legacy_invert(pixels, args.legacy_size, args.legacy_size, rowstride, n_channels)
+        if imaging.invert_pixels(pixels, args.legacy_size, rowstride, n_channels, has_alpha) != expected:
+            print(f"{name}: lookup table result differs from the old loop", file=sys.stderr)
+            return 1
+        legacy = ms_per_megapixel(
+            lambda: legacy_invert(pixels, args.legacy_size, args.legacy_size, rowstride, n_channels),
+            args.legacy_size, args.repeats
+        )
+
+        pixels, rowstride = make_buffer(args.size, n_channels, padding)
+        current = ms_per_megapixel(
+            lambda: imaging.invert_pixels(pixels, args.size, rowstride, n_channels, has_alpha),
+            args.size, args.repeats
+        )
+        results[name] = {
+            "legacy_ms_per_mpx": round(legacy, 3),
+            "lookup_table_ms_per_mpx": round(current, 3),
+            "speedup": round(legacy / current, 1),
+        }
+
+    print(json.dumps({"python": sys.version.split()[0], "layouts": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
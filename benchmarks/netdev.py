@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# Cost of one network idle sample (read /proc/net/dev, parse, smooth),
+# measured on a synthetic /proc/net/dev with 30 interfaces
+#
+#   python3 benchmarks/netdev.py [--interface wlp3s0] [--file /proc/net/dev]
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from clockout import rates
+
+FIXTURE = os.path.join(ROOT, "benchmarks", "fixtures", "net_dev")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the network idle sampler.")
+    parser.add_argument("--file", default=FIXTURE, help="/proc/net/dev style file")
+    parser.add_argument("--interface", default="enp0s31f6", help="interface to sample (default: last in fixture)")
+    parser.add_argument("--samples", type=int, default=200000)
+    args = parser.parse_args()
+
+    idle = rates.NetworkIdle(args.interface, 50000, 600, args.file)
+    # Fake clock, so every sample takes the full smoothing path
+    clock = [0.0]
+
+    def sample():
+        clock[0] += rates.NETWORK_SAMPLE_SECONDS
+        idle.sample(clock[0])
+
+    for _ in range(1000):
+        sample()
+    started_wall = time.perf_counter()
+    started_cpu = time.process_time()
+    for _ in range(args.samples):
+        sample()
+    wall = (time.perf_counter() - started_wall) / args.samples
+    cpu = (time.process_time() - started_cpu) / args.samples
+    idle.close()
+
+    print(json.dumps({
+        "file_bytes": os.path.getsize(args.file),
+        "sample_wall_us": round(wall * 1e6, 3),
+        "sample_cpu_us": round(cpu * 1e6, 3),
+        "sample_interval_s": rates.NETWORK_SAMPLE_SECONDS,
+        # Share of one core spent sampling while the trigger waits
+        "cpu_percent": round(cpu / rates.NETWORK_SAMPLE_SECONDS * 100, 6),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
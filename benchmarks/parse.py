@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# Throughput of the time and duration parsers, i.e. the cost of one
+# keystroke's validation in the GUI preview. strptime("%H:%M"), which the
+# windows used before, is measured for comparison.
+#
+#   python3 benchmarks/parse.py [--calls 200000] [--budget-us 20]
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from clockout import parsing
+
+EXPRESSIONS = [
+    ("time", "23:15"),
+    ("time", "23:15 tomorrow"),
+    ("time", "2099-10-20 23:00"),
+    ("duration", "90"),
+    ("duration", "1:30"),
+    ("duration", "1h30m"),
+    ("duration", "45s"),
+]
+
+
+def per_call_us(function, calls):
+    # Best of five runs, the least disturbed one
+    return min(timeit.repeat(function, number=calls, repeat=5)) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the time expression parsers.")
+    parser.add_argument("--calls", type=int, default=200000, help="calls per expression and run")
+    parser.add_argument("--budget-us", type=float, default=20.0, help="fail above this per call (default: 20)")
+    args = parser.parse_args()
+
+    now = datetime.now()
+    results = {}
+    for kind, text in EXPRESSIONS:
+        parse = parsing.parse_time if kind == "time" else parsing.parse_duration
+        results[text] = round(per_call_us(lambda: parse(text, now), args.calls), 3)
+    baseline = round(per_call_us(lambda: datetime.strptime("23:15", "%H:%M"), args.calls), 3)
+
+    slowest = max(results.values())
+    print(json.dumps({
+        "python": sys.version.split()[0],
+        "time": int(time.time()),
+        "parse_us": results,
+        "strptime_hhmm_us": baseline,
+        "slowest_us": slowest,
+        "budget_us": args.budget_us,
+    }, indent=2))
+    if slowest > args.budget_us:
+        print(f"Slowest expression takes {slowest} us, over the {args.budget_us} us budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# Headless ClockOut benchmarks: time to first frame (cold and warm image
+# cache), peak RSS, before and after opening the About dialog, image
+# decoding/inversion and the latency from Enter in the duration field to the
+# status label. Results are written as JSON and
+# can be compared against an earlier run with --baseline.
+#
+#   python3 benchmarks/run.py --output results.json
+#   python3 benchmarks/run.py --baseline results.json
+#
+# Runs under Xvfb or, if that is missing, the GDK Broadway backend. shutdown,
+# notify-send, systemctl, systemd-run and busctl are replaced by no-ops and
+# both D-Bus buses are pointed at nothing, so nothing is ever scheduled.
+import argparse
+import json
+import os
+import platform
+import runpy
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from clockout import profile
+
+DEFAULT_SCRIPTS = ["english us clockout.py", "mini english us clockout.py"]
+FAKE_COMMANDS = ["shutdown", "notify-send", "systemctl", "systemd-run", "busctl"]
+
+# Seconds to wait for a launch to paint its first frame
+LAUNCH_TIMEOUT = 30
+
+
+def make_environment(workdir, display_env):
+    # No-op system commands first on PATH, no reachable D-Bus
+    bin_dir = os.path.join(workdir, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    for name in FAKE_COMMANDS:
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write("#!/bin/sh\nexit 0\n")
+        os.chmod(path, 0o755)
+
+    env = dict(os.environ, **display_env)
+    env["PATH"] = bin_dir + os.pathsep + env.get("PATH", "")
+    env["DBUS_SYSTEM_BUS_ADDRESS"] = "unix:path=/nonexistent"
+    env["DBUS_SESSION_BUS_ADDRESS"] = "unix:path=/nonexistent"
+    env["NO_AT_BRIDGE"] = "1"
+    # Dark theme, so the icon inversion is part of every cold launch
+    env["GTK_THEME"] = "Adwaita:dark"
+    env.pop(profile.PROFILE_VARIABLE, None)
+    return env
+
+
+def start_display():
+    # Returns (environment additions, process to stop afterwards)
+    if shutil.which("Xvfb"):
+        read_fd, write_fd = os.pipe()
+        process = subprocess.Popen(
+            ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+            pass_fds=[write_fd], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            display = f.readline().strip()
+        return {"DISPLAY": f":{display}", "GDK_BACKEND": "x11"}, process
+    if shutil.which("broadwayd"):
+        process = subprocess.Popen(
+            ["broadwayd", ":7"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        time.sleep(1)
+        return {"GDK_BACKEND": "broadway", "BROADWAY_DISPLAY": ":7"}, process
+    sys.exit("Neither Xvfb nor broadwayd found")
+
+
+def launch(args, env, report_path):
+    # Start a ClockOut process, wait for the JSON report it writes and stop
+    # it; returns (report, peak RSS in KiB)
+    process = subprocess.Popen(
+        [sys.executable] + args, cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + LAUNCH_TIMEOUT
+    while not os.path.exists(report_path) and process.poll() is None:
+        if time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+    # wait4 instead of wait, for the child's resource usage
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    try:
+        with open(report_path) as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        raise RuntimeError(f"{args[0]} did not write its report") from None
+    os.remove(report_path)
+    return report, usage.ru_maxrss
+
+
+def measure_startup(script, env, workdir, runs):
+    cache_dir = os.path.join(workdir, "cache")
+    profile_path = os.path.join(workdir, "profile.json")
+    results = {"cold_first_frame_s": [], "warm_first_frame_s": [], "peak_rss_kib": []}
+    phases = {}
+    for _ in range(runs):
+        for state in ("cold", "warm"):
+            if state == "cold":
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            report, rss = launch(
+                [script, f"--profile-startup={profile_path}"],
+                dict(env, XDG_CACHE_HOME=cache_dir),
+                profile_path
+            )
+            # Counted from exec, so interpreter startup is included
+            results[f"{state}_first_frame_s"].append((report["process_age_at_start"] or 0) + report["total"])
+            results["peak_rss_kib"].append(rss)
+            for phase in report["phases"]:
+                phases.setdefault(f"{state}:{phase['phase']}", []).append(phase["took"])
+    results.update({f"phase_s:{name}": values for name, values in phases.items()})
+    return results
+
+
+def measure_interaction(script, env, workdir, repeats):
+    # Runs the script inside this file's --probe mode, see probe()
+    output = os.path.join(workdir, "probe.json")
+    results, _ = launch(
+        [os.path.abspath(__file__), "--probe", script, output, str(repeats)],
+        dict(env, XDG_CACHE_HOME=os.path.join(workdir, "cache")),
+        output
+    )
+    return results
+
+
+def probe(script, output, repeats):
+    # Executed inside the ClockOut process: waits for the window, opens the
+    # About dialog once, then presses Enter in entry_duration and times the
+    # status label update
+    import resource
+    from gi.repository import GLib, Gio
+
+    results = {"enter_to_status_s": []}
+
+    def find_window():
+        application = Gio.Application.get_default()
+        window = getattr(application, "window", None)
+        if window is None or not window.get_mapped():
+            return True
+        window.radio_duration.set_active(True)
+        window.label_status.connect("notify::label", on_label, window)
+        # Only the full windows have images and an About dialog
+        if hasattr(window, "assets"):
+            open_about(window)
+        else:
+            press_enter(window)
+        return False
+
+    def peak_rss():
+        # KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def open_about(window):
+        # Before the image benchmarks, which decode at full size
+        results["peak_rss_before_about_kib"] = [peak_rss()]
+        window.show_about_dialog(None)
+        window.about_dialog.connect_after("draw", on_about_drawn, window)
+
+    def on_about_drawn(dialog, cr, window):
+        dialog.disconnect_by_func(on_about_drawn)
+        results["peak_rss_after_about_kib"] = [peak_rss()]
+        dialog.hide()
+        measure_images(window.assets)
+        GLib.idle_add(lambda: press_enter(window) or False)
+        return False
+
+    def press_enter(window):
+        window.label_status.set_text("")
+        window.entry_duration.set_text(str(90 + len(results["enter_to_status_s"])))
+        results["pending"] = time.perf_counter()
+        window.entry_duration.activate()
+
+    def on_label(label, pspec, window):
+        if "pending" not in results or not label.get_text():
+            return
+        started = results.pop("pending")
+        results["enter_to_status_s"].append(time.perf_counter() - started)
+        if len(results["enter_to_status_s"]) < repeats:
+            GLib.idle_add(lambda: press_enter(window) or False)
+            return
+        with open(output + ".tmp", "w") as f:
+            json.dump(results, f)
+        os.replace(output + ".tmp", output)
+
+    def measure_images(assets):
+        for name, divisor in (("clockoutbg.png", 1.5), ("enter.png", 2)):
+            pixbuf = assets.decode_scaled_asset(name, divisor)
+            results[f"decode_s:{name}"] = timed(lambda: assets.decode_scaled_asset(name, divisor), repeats)
+            results[f"invert_s:{name}"] = timed(lambda: assets.invert_pixbuf(pixbuf), repeats)
+
+    GLib.timeout_add(20, find_window)
+    sys.argv = [os.path.join(ROOT, script)]
+    try:
+        runpy.run_path(sys.argv[0], run_name="__main__")
+    except SystemExit:
+        pass
+
+
+def timed(function, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(samples):
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "runs": len(samples),
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Medians that got slower (or bigger) by more than the tolerance
+    regressions = []
+    for script, metrics in results["scripts"].items():
+        for metric, summary in metrics.items():
+            old = baseline.get("scripts", {}).get(script, {}).get(metric)
+            if old and old["median"] > 0 and summary["median"] > old["median"] * (1 + tolerance):
+                regressions.append(
+                    f"{script}: {metric} {old['median']:.6g} -> {summary['median']:.6g} "
+                    f"(+{(summary['median'] / old['median'] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--probe":
+        probe(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Headless ClockOut benchmarks.")
+    parser.add_argument("--script", action="append", help="script to measure (default: full and mini US)")
+    parser.add_argument("--runs", type=int, default=5, help="cold and warm launches per script")
+    parser.add_argument("--repeats", type=int, default=20, help="repetitions of the in-process measurements")
+    parser.add_argument("--output", help="write the results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown (default: 0.10)")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "kernel": platform.release(),
+            "time": int(time.time()),
+        },
+        "scripts": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="clockout-bench-") as workdir:
+        display_env, display = start_display()
+        try:
+            env = make_environment(workdir, display_env)
+            for script in args.script or DEFAULT_SCRIPTS:
+                samples = measure_startup(script, env, workdir, args.runs)
+                samples.update(measure_interaction(script, env, workdir, args.repeats))
+                results["scripts"][script] = {metric: summarize(values) for metric, values in samples.items() if values}
+        finally:
+            display.terminate()
+            display.wait()
+
+    report = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
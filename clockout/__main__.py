@@ -0,0 +1,5 @@
+import sys
+
+from clockout.cli import main
+
+sys.exit(main())
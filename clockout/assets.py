@@ -0,0 +1,144 @@
+# Images for the full windows: read from the GResource bundle or the loose
+# PNGs, decoded straight to their display size and cached as raw pixels
+# (inverted for dark themes), so a warm launch decodes nothing.
+import hashlib
+import os
+import struct
+
+from gi.repository import GdkPixbuf, GLib, Gio
+
+from clockout import imaging
+
+# Cache for scaled (and inverted) images
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "clockout")
+CACHE_MAX_BYTES = 4 * 1024 * 1024
+CACHE_HEADER = struct.Struct("<IIIB")  # width, height, rowstride, has_alpha
+
+# Compiled asset bundle (see clockout.gresource.xml)
+RESOURCE_FILE = "clockout.gresource"
+RESOURCE_PREFIX = "/org/clockout/ClockOut/"
+
+
+class Assets:
+    # script_dir: where the loose PNGs are; profile: the script's
+    # profile.StartupProfile, marked per image
+    def __init__(self, script_dir, profile):
+        self.script_dir = script_dir
+        self.profile = profile
+        self.resource_path = self.load_resources()
+
+    def load_resources(self):
+        # Memory-map the asset bundle once, searching next to the script first
+        data_dirs = [GLib.get_user_data_dir()] + GLib.get_system_data_dirs()
+        candidates = [os.path.join(self.script_dir, RESOURCE_FILE)]
+        candidates += [os.path.join(data_dir, "clockout", RESOURCE_FILE) for data_dir in data_dirs]
+        for resource_path in candidates:
+            try:
+                Gio.Resource.load(resource_path)._register()
+                return resource_path
+            except GLib.Error:
+                continue
+        return None
+
+    def read_asset(self, name):
+        # Zero-copy lookup in the bundle, plain file next to the script otherwise
+        if self.resource_path:
+            return Gio.resources_lookup_data(RESOURCE_PREFIX + name, Gio.ResourceLookupFlags.NONE)
+        with open(os.path.join(self.script_dir, name), "rb") as f:
+            return GLib.Bytes.new(f.read())
+
+    def decode_scaled_asset(self, name, divisor):
+        # Decode straight to the target size
+        loader = GdkPixbuf.PixbufLoader()
+        loader.connect(
+            "size-prepared",
+            lambda loader, width, height: loader.set_size(int(width // divisor), int(height // divisor))
+        )
+        loader.write_bytes(self.read_asset(name))
+        loader.close()
+        return loader.get_pixbuf()
+
+    def load_scaled_pixbuf(self, name, divisor, invert=False):
+        # Cache key covers everything that changes the final pixels
+        path = self.resource_path or os.path.join(self.script_dir, name)
+        mtime = os.stat(path).st_mtime_ns
+        key = hashlib.sha1(f"{path}:{name}:{mtime}:{divisor}:{int(invert)}".encode()).hexdigest()
+        cache_path = os.path.join(CACHE_DIR, key)
+
+        # Warm launch: raw pixels straight from the cache
+        try:
+            with open(cache_path, "rb") as f:
+                width, height, rowstride, has_alpha = CACHE_HEADER.unpack(f.read(CACHE_HEADER.size))
+                pixels = f.read()
+            if len(pixels) < rowstride * (height - 1) + width * (4 if has_alpha else 3):
+                raise ValueError("truncated cache entry")
+            os.utime(cache_path)
+            self.profile.mark(f"cache_hit:{name}")
+            return GdkPixbuf.Pixbuf.new_from_bytes(
+                GLib.Bytes.new(pixels),
+                GdkPixbuf.Colorspace.RGB,
+                bool(has_alpha),
+                8,
+                width,
+                height,
+                rowstride
+            )
+        except (OSError, ValueError, struct.error):
+            pass
+
+        # Cold launch: decode at target size, invert and store
+        scaled = self.decode_scaled_asset(name, divisor)
+        self.profile.mark(f"decode:{name}")
+        if invert:
+            scaled = self.invert_pixbuf(scaled)
+            self.profile.mark(f"invert:{name}")
+        self.store_cached_pixbuf(cache_path, scaled)
+        self.profile.mark(f"cache_store:{name}")
+        return scaled
+
+    def store_cached_pixbuf(self, cache_path, pixbuf):
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(CACHE_HEADER.pack(
+                    pixbuf.get_width(),
+                    pixbuf.get_height(),
+                    pixbuf.get_rowstride(),
+                    pixbuf.get_has_alpha()
+                ))
+                f.write(pixbuf.get_pixels())
+            os.replace(tmp_path, cache_path)
+            self.trim_cache()
+        except OSError as e:
+            print(f"Error writing image cache: {e}")
+
+    def trim_cache(self):
+        # Evict least recently used entries beyond the size limit
+        with os.scandir(CACHE_DIR) as it:
+            entries = sorted((e.stat().st_mtime, e.stat().st_size, e.path) for e in it if e.is_file())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= CACHE_MAX_BYTES:
+                break
+            os.remove(path)
+            total -= size
+
+    def invert_pixbuf(self, pixbuf):
+        # Whole buffer at once through a lookup table, see imaging.invert_pixels
+        inverted = imaging.invert_pixels(
+            pixbuf.get_pixels(),
+            pixbuf.get_width(),
+            pixbuf.get_rowstride(),
+            pixbuf.get_n_channels(),
+            pixbuf.get_has_alpha()
+        )
+        return GdkPixbuf.Pixbuf.new_from_bytes(
+            GLib.Bytes.new(inverted),
+            pixbuf.get_colorspace(),
+            pixbuf.get_has_alpha(),
+            pixbuf.get_bits_per_sample(),
+            pixbuf.get_width(),
+            pixbuf.get_height(),
+            pixbuf.get_rowstride()
+        )
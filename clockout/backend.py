@@ -0,0 +1,354 @@
+# Shutdown scheduling shared by all ClockOut windows: logind over D-Bus with
+# the shutdown command as fallback, or a transient systemd timer. Uses Gio,
+# but no GTK, so it can be driven without a window.
+import time
+from collections import deque
+from datetime import datetime
+
+from gi.repository import GLib, Gio
+
+from clockout import schedule
+
+# Seconds before a hanging command is killed
+COMMAND_TIMEOUT = 10
+
+# logind D-Bus API, the shutdown command is used if it is unavailable
+LOGIND_NAME = "org.freedesktop.login1"
+LOGIND_PATH = "/org/freedesktop/login1"
+LOGIND_INTERFACE = "org.freedesktop.login1.Manager"
+
+# Notification D-Bus API, notify-send is used if it is unavailable
+NOTIFICATIONS_NAME = "org.freedesktop.Notifications"
+NOTIFICATIONS_PATH = "/org/freedesktop/Notifications"
+NOTIFICATIONS_INTERFACE = "org.freedesktop.Notifications"
+
+# D-Bus errors meaning the service is not there at all; anything else, a
+# timeout or a closed connection included, is reported instead
+SERVICE_MISSING_ERRORS = (
+    "org.freedesktop.DBus.Error.ServiceUnknown",
+    "org.freedesktop.DBus.Error.NameHasNoOwner",
+    "org.freedesktop.DBus.Error.UnknownObject",
+    "org.freedesktop.DBus.Error.UnknownMethod",
+)
+
+
+class Scheduler:
+    # Which shutdown is pending and through which backend; all calls are
+    # asynchronous and run one at a time, in the order they were made
+    def __init__(self):
+        self.shutdown_scheduled = False
+        self.timer_scheduled = False
+        self.command_queue = deque()
+        self.command_running = False
+        self.buses = {}
+        self.bus_waiters = {}
+        self.notification_id = 0
+        self.handoff_timeout_id = None
+        # A "shutdown -h" from the fallback that hasn't been canceled yet
+        self.shutdown_command_pending = False
+        # Counts schedule and cancel requests, so a schedule that finishes
+        # after a later cancel doesn't mark the shutdown as pending again
+        self.requests = 0
+
+    def schedule(self, deadline, keep, on_done=None):
+        # keep: use the systemd timer, so the shutdown survives ClockOut
+        if self.shutdown_scheduled and keep != self.timer_scheduled:
+            self.cancel_backend()
+        self.timer_scheduled = keep
+        self.requests += 1
+        request = self.requests
+        finish = lambda error: self.on_scheduled(error, request, on_done)
+        if keep:
+            self.schedule_timer_shutdown(deadline, finish)
+        else:
+            self.schedule_system_shutdown(deadline, finish)
+
+    def on_scheduled(self, error, request, on_done):
+        if not error and request == self.requests:
+            self.shutdown_scheduled = True
+        if on_done:
+            on_done(error)
+
+    def reschedule(self, deadline):
+        # Move a pending shutdown, keeping its backend
+        if not self.shutdown_scheduled:
+            return
+        if self.timer_scheduled:
+            self.schedule_timer_shutdown(deadline)
+        else:
+            self.schedule_system_shutdown(deadline)
+
+    def cancel(self, on_done=None):
+        self.requests += 1
+        self.cancel_backend(on_done)
+        self.shutdown_scheduled = False
+
+    def cancel_backend(self, on_done=None):
+        if self.timer_scheduled:
+            self.run_command(schedule.timer_cancel_command(), on_done)
+            self.timer_scheduled = False
+        else:
+            self.cancel_system_shutdown(on_done)
+
+    def restore(self, deadline, timer):
+        # Adopt a shutdown left pending by an earlier run; False if there is
+        # one already or it is in the past
+        if self.shutdown_scheduled or deadline <= datetime.now():
+            return False
+        self.shutdown_scheduled = True
+        self.timer_scheduled = timer
+        return True
+
+    def query_timer(self, on_deadline):
+        # Calls back with the deadline of a pending systemd timer, if any
+        self.read_command(schedule.timer_query_command(), lambda output: self.on_timer_output(output, on_deadline))
+
+    def on_timer_output(self, output, on_deadline):
+        deadline = schedule.parse_timer_elapse(output)
+        if deadline:
+            on_deadline(deadline)
+
+    def watch_sleep(self, on_resume):
+        self.with_bus(Gio.BusType.SYSTEM, lambda bus: self.subscribe_sleep(bus, on_resume))
+
+    def subscribe_sleep(self, bus, on_resume):
+        if not bus:
+            return
+        bus.signal_subscribe(
+            LOGIND_NAME, LOGIND_INTERFACE, "PrepareForSleep", LOGIND_PATH, None,
+            Gio.DBusSignalFlags.NONE, self.on_prepare_for_sleep, on_resume
+        )
+
+    def on_prepare_for_sleep(self, bus, sender, path, interface, signal, parameters, on_resume):
+        # True right before suspend, False after resume
+        if not parameters.unpack()[0]:
+            on_resume()
+
+    def notify(self, title, message, on_done=None):
+        self.queue_operation(lambda finish: self.start_notification(title, message, finish), on_done)
+
+    def schedule_timer_shutdown(self, deadline, on_done=None):
+        # A transient systemd timer keeps the schedule after ClockOut exits
+        self.run_command(schedule.timer_cancel_command())
+        self.run_command(schedule.timer_schedule_command(deadline), on_done)
+
+    def schedule_system_shutdown(self, deadline, on_done=None):
+        self.call_logind(
+            "ScheduleShutdown",
+            GLib.Variant("(st)", ("poweroff", schedule.logind_usec(deadline))),
+            lambda finish: self.start_shutdown_handoff(deadline, finish, on_done),
+            on_done
+        )
+
+    def cancel_system_shutdown(self, on_done=None):
+        self.call_logind(
+            "CancelScheduledShutdown",
+            None,
+            self.start_cancel_command,
+            on_done
+        )
+
+    def start_shutdown_handoff(self, deadline, finish, on_done):
+        # An earlier "shutdown -h" would still fire at the old time while
+        # the new deadline waits out its odd seconds, so it goes first
+        if self.shutdown_command_pending:
+            self.start_cancel_command(
+                lambda error: finish(error) if error else self.arm_shutdown_handoff(deadline, finish, on_done)
+            )
+            return
+        self.arm_shutdown_handoff(deadline, finish, on_done)
+
+    def arm_shutdown_handoff(self, deadline, finish, on_done):
+        # Wait out the odd seconds first, then hand off the full minutes
+        wait_ms, minutes = schedule.split_handoff(deadline, time.time())
+        if wait_ms == 0:
+            self.start_shutdown_command(minutes, finish)
+            return
+        self.handoff_timeout_id = GLib.timeout_add(wait_ms, self.on_shutdown_handoff, minutes, on_done)
+        finish(None)
+
+    def on_shutdown_handoff(self, minutes, on_done):
+        self.handoff_timeout_id = None
+        self.queue_operation(
+            lambda finish: self.start_shutdown_command(minutes, finish),
+            lambda error: on_done(error) if error and on_done else None
+        )
+        return False
+
+    def start_shutdown_command(self, minutes, finish):
+        self.start_command(["shutdown", "-h", f"+{minutes}"], lambda error: self.on_shutdown_command(error, True, finish))
+
+    def start_cancel_command(self, finish):
+        self.start_command(["shutdown", "-c"], lambda error: self.on_shutdown_command(error, False, finish))
+
+    def on_shutdown_command(self, error, pending, finish):
+        if not error:
+            self.shutdown_command_pending = pending
+        finish(error)
+
+    def call_logind(self, method, parameters, fallback, on_done=None):
+        self.queue_operation(
+            lambda finish: self.start_logind_call(method, parameters, fallback, finish),
+            on_done
+        )
+
+    def start_logind_call(self, method, parameters, fallback, finish):
+        # A new request always supersedes a pending handoff
+        if self.handoff_timeout_id:
+            GLib.source_remove(self.handoff_timeout_id)
+            self.handoff_timeout_id = None
+        self.with_bus(Gio.BusType.SYSTEM, lambda bus: self.send_logind_call(bus, method, parameters, fallback, finish))
+
+    def send_logind_call(self, bus, method, parameters, fallback, finish):
+        if not bus:
+            fallback(finish)
+            return
+        bus.call(
+            LOGIND_NAME, LOGIND_PATH, LOGIND_INTERFACE, method, parameters, None,
+            # No timeout: the reply may wait on a polkit password prompt
+            Gio.DBusCallFlags.ALLOW_INTERACTIVE_AUTHORIZATION, GLib.MAXINT, None,
+            self.on_logind_reply, (fallback, finish)
+        )
+
+    def on_logind_reply(self, bus, result, data):
+        fallback, finish = data
+        try:
+            bus.call_finish(result)
+        except GLib.Error as e:
+            # Only fall back to the command when logind itself is unavailable
+            if self.is_service_missing(e):
+                fallback(finish)
+            else:
+                finish(e.message)
+            return
+        finish(None)
+
+    def start_notification(self, title, message, finish):
+        self.with_bus(Gio.BusType.SESSION, lambda bus: self.send_notify(bus, title, message, finish))
+
+    def send_notify(self, bus, title, message, finish):
+        if not bus:
+            self.start_command(["notify-send", title, message], finish)
+            return
+        # Reuse the last bubble so a reschedule updates it in place
+        bus.call(
+            NOTIFICATIONS_NAME, NOTIFICATIONS_PATH, NOTIFICATIONS_INTERFACE, "Notify",
+            GLib.Variant("(susssasa{sv}i)", ("ClockOut", self.notification_id, "", title, message, [], {}, -1)),
+            GLib.VariantType("(u)"), Gio.DBusCallFlags.NONE, COMMAND_TIMEOUT * 1000, None,
+            self.on_notification_reply, (title, message, finish)
+        )
+
+    def on_notification_reply(self, bus, result, data):
+        title, message, finish = data
+        try:
+            self.notification_id = bus.call_finish(result).unpack()[0]
+        except GLib.Error as e:
+            if self.is_service_missing(e):
+                self.start_command(["notify-send", title, message], finish)
+            else:
+                finish(e.message)
+            return
+        finish(None)
+
+    def with_bus(self, bus_type, callback):
+        # Calls back with the bus connection, None if there is no such bus.
+        # Connects without blocking the main loop, callers wait meanwhile;
+        # one connection per bus for the lifetime of the scheduler.
+        if bus_type in self.buses:
+            callback(self.buses[bus_type])
+            return
+        waiters = self.bus_waiters.setdefault(bus_type, [])
+        waiters.append(callback)
+        if len(waiters) == 1:
+            Gio.bus_get(bus_type, None, self.on_bus_ready, bus_type)
+
+    def on_bus_ready(self, source, result, bus_type):
+        try:
+            bus = Gio.bus_get_finish(result)
+            self.buses[bus_type] = bus
+        except GLib.Error:
+            # Not kept, the next caller tries again
+            bus = None
+        for callback in self.bus_waiters.pop(bus_type):
+            callback(bus)
+
+    def is_service_missing(self, error):
+        return Gio.DBusError.get_remote_error(error) in SERVICE_MISSING_ERRORS
+
+    def run_command(self, args, on_done=None):
+        self.queue_operation(lambda finish: self.start_command(args, finish), on_done)
+
+    def after_commands(self, callback):
+        # Call back once every queued operation has finished
+        self.queue_operation(None, callback)
+
+    def queue_operation(self, start, on_done):
+        # Operations run one at a time, in the order they were requested
+        self.command_queue.append((start, on_done))
+        if not self.command_running:
+            self.run_next_command()
+
+    def run_next_command(self):
+        while self.command_queue and not self.command_running:
+            start, on_done = self.command_queue.popleft()
+            if start is None:
+                on_done()
+                continue
+            self.command_running = True
+            start(lambda error, on_done=on_done: self.on_command_finished(error, on_done))
+
+    def on_command_finished(self, error, on_done):
+        self.command_running = False
+        if on_done:
+            on_done(error)
+        self.run_next_command()
+
+    def read_command(self, args, on_output):
+        self.queue_operation(lambda finish: self.start_read_command(args, on_output, finish), None)
+
+    def start_read_command(self, args, on_output, finish):
+        try:
+            process = Gio.Subprocess.new(
+                args, Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_SILENCE
+            )
+        except GLib.Error as e:
+            finish(e.message)
+            return
+        process.communicate_utf8_async(None, None, self.on_command_output, (on_output, finish))
+
+    def on_command_output(self, process, result, data):
+        on_output, finish = data
+        try:
+            _, stdout, _ = process.communicate_utf8_finish(result)
+        except GLib.Error as e:
+            finish(e.message)
+            return
+        if process.get_successful():
+            on_output(stdout)
+        finish(None)
+
+    def start_command(self, args, finish):
+        try:
+            process = Gio.Subprocess.new(args, Gio.SubprocessFlags.NONE)
+        except GLib.Error as e:
+            finish(e.message)
+            return
+        pending = [finish, None]
+        pending[1] = GLib.timeout_add_seconds(COMMAND_TIMEOUT, self.on_command_timeout, process, pending)
+        process.wait_check_async(None, self.on_process_exited, pending)
+
+    def on_command_timeout(self, process, pending):
+        pending[1] = None
+        process.force_exit()
+        return False
+
+    def on_process_exited(self, process, result, pending):
+        finish, timeout_id = pending
+        if timeout_id:
+            GLib.source_remove(timeout_id)
+        try:
+            process.wait_check_finish(result)
+        except GLib.Error as e:
+            finish(e.message)
+            return
+        finish(None)
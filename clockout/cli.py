@@ -0,0 +1,201 @@
+# Headless front end: clockout at 23:15 | in 1:30 | after wget | after net | after disk | after dir PATH | run -- cmd | cancel | status
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+from clockout import inotify, parsing, processes, rates, schedule, texts
+
+LOGIND_CALL = [
+    "busctl", "call", "org.freedesktop.login1",
+    "/org/freedesktop/login1", "org.freedesktop.login1.Manager",
+]
+
+
+def run(args):
+    # Imported here, status and --help do not need it
+    import subprocess
+    try:
+        return subprocess.run(args, stdout=subprocess.DEVNULL).returncode == 0
+    except OSError:
+        return False
+
+
+def schedule_shutdown(deadline):
+    # logind takes microseconds, shutdown only whole minutes (rounded up)
+    if run(LOGIND_CALL + ["ScheduleShutdown", "st", "poweroff", str(schedule.logind_usec(deadline))]):
+        return True
+    minutes = -(-int(deadline.timestamp() - datetime.now().timestamp()) // 60)
+    return run(["shutdown", "-h", f"+{max(0, minutes)}"])
+
+
+def cancel_shutdown():
+    return run(LOGIND_CALL + ["CancelScheduledShutdown"]) or run(["shutdown", "-c"])
+
+
+def wait_for_processes(pids):
+    # Sleeps in poll() until every pidfd turned readable, no busy waiting
+    import select
+    poller = select.poll()
+    remaining = set()
+    for pid in pids:
+        try:
+            fd = processes.open_pidfd(pid)
+        except (AttributeError, OSError):
+            # Without pidfd support, check now and then instead
+            while processes.process_alive(pid):
+                time.sleep(5)
+            continue
+        if fd is not None:
+            poller.register(fd, select.POLLIN)
+            remaining.add(fd)
+    while remaining:
+        for fd, _ in poller.poll():
+            poller.unregister(fd)
+            os.close(fd)
+            remaining.discard(fd)
+
+
+def wait_for_idle(idle, interval, sync=False):
+    # Same sampling as the GUI watches, with sleep() as the timer
+    try:
+        while not idle.sample():
+            if sync and idle.sync_due:
+                os.sync()
+            time.sleep(interval)
+    finally:
+        idle.close()
+
+
+def wait_for_directory(trigger):
+    # Sleeps in poll() until inotify reports something or the quiet period
+    # may be over
+    import select
+    _, path, hold = trigger
+    quiet = inotify.DirectoryQuiet(path, hold)
+    poller = select.poll()
+    poller.register(quiet.fd, select.POLLIN)
+    try:
+        while True:
+            remaining = quiet.remaining()
+            if remaining <= 0:
+                return
+            if poller.poll(max(1, int(remaining * 1000))):
+                quiet.read_events()
+    finally:
+        quiet.close()
+
+
+def wait_for_trigger(args, parser):
+    # Blocks until the trigger fires; returns an exit status if no shutdown
+    # should follow
+    strings = texts.TEXTS[args.language]
+    try:
+        if args.command == "after":
+            try:
+                trigger = parsing.parse_trigger(" ".join(args.processes), processes.ProcessIndex())
+                if trigger[0] == "network":
+                    _, interface, threshold, hold = trigger
+                    print(strings["waiting_for"].format(texts.describe_trigger(trigger, args.language)))
+                    wait_for_idle(rates.NetworkIdle(interface, threshold, hold), rates.NETWORK_SAMPLE_SECONDS)
+                    return 0
+                if trigger[0] == "disk":
+                    _, devices, threshold, hold, sync = trigger
+                    idle = rates.DiskIdle(devices, threshold, hold)
+                    # The devices the default picked, by name
+                    trigger = ("disk", idle.devices, threshold, hold, sync)
+                    print(strings["waiting_for"].format(texts.describe_trigger(trigger, args.language)))
+                    wait_for_idle(idle, rates.DISK_SAMPLE_SECONDS, sync)
+                    return 0
+                if trigger[0] == "idle":
+                    parser.error("the idle trigger needs a desktop session, use it from the window")
+                if trigger[0] == "directory":
+                    print(strings["waiting_for"].format(texts.describe_trigger(trigger, args.language)))
+                    wait_for_directory(trigger)
+                    return 0
+            except (ValueError, OSError) as e:
+                parser.error(str(e))
+            print(strings["waiting_for"].format(texts.describe_trigger(trigger, args.language)))
+            wait_for_processes(trigger[1])
+            return 0
+
+        import subprocess
+        command = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+        if not command:
+            parser.error("no command given")
+        try:
+            returncode = subprocess.run(command).returncode
+        except OSError as e:
+            print(strings["start_failed"].format(e), file=sys.stderr)
+            return 127
+        if args.on_success and returncode != 0:
+            print(strings["run_failed"].format(returncode), file=sys.stderr)
+            return returncode
+        return 0
+    except KeyboardInterrupt:
+        print(strings["interrupted"], file=sys.stderr)
+        return 130
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="clockout", description="Schedule a system shutdown.")
+    parser.add_argument("--language", choices=sorted(texts.TEXTS), default=texts.locale_language(os.environ),
+                        help="language of the messages (default: from the locale)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("at", help="shut down at HH:MM, 'HH:MM tomorrow' or 'YYYY-MM-DD HH:MM'").add_argument(
+        "time", nargs="+"
+    )
+    commands.add_parser("in", help="shut down after minutes (MM), hours (HH:MM) or e.g. 1h30m / 45s").add_argument(
+        "duration", nargs="+"
+    )
+    commands.add_parser("after", help="shut down once these PIDs or process names have exited, or on 'net [IFACE] [KB/s] [min]' / 'disk [DEV] [MB/s] [min] [sync]' / 'dir PATH [min]'").add_argument(
+        "processes", nargs="+"
+    )
+    run_parser = commands.add_parser("run", help="run a command and shut down when it exits")
+    run_parser.add_argument("--on-success", action="store_true", help="only shut down if the command succeeded")
+    run_parser.add_argument("cmd", nargs=argparse.REMAINDER, help="the command, after --")
+    commands.add_parser("cancel", help="cancel a scheduled shutdown")
+    commands.add_parser("status", help="show the scheduled shutdown")
+    args = parser.parse_args(argv)
+    strings = texts.TEXTS[args.language]
+    now = datetime.now()
+
+    if args.command == "status":
+        deadline = schedule.read_scheduled_shutdown()
+        if deadline is None:
+            print(strings["no_shutdown"])
+        else:
+            print(texts.format_scheduled(deadline, now, args.language))
+        return 0
+
+    if args.command == "cancel":
+        if not cancel_shutdown():
+            print(strings["cancel_failed"], file=sys.stderr)
+            return 1
+        print(strings["canceled_message"])
+        return 0
+
+    if args.command in ("after", "run"):
+        status = wait_for_trigger(args, parser)
+        if status:
+            return status
+        # A short grace period, so the shutdown can still be canceled
+        now = datetime.now()
+        deadline = schedule.deadline_after(schedule.TRIGGER_GRACE)
+    else:
+        try:
+            if args.command == "at":
+                deadline = parsing.parse_time(" ".join(args.time), now)
+            else:
+                deadline = parsing.parse_duration(" ".join(args.duration), now)
+        except ValueError:
+            if args.command == "at":
+                parser.error("invalid time! Format: HH:MM, HH:MM tomorrow or YYYY-MM-DD HH:MM")
+            parser.error("invalid format! Use minutes (e.g. 90), hours:minutes (e.g. 1:30) or units (e.g. 1h30m, 45s).")
+
+    if not schedule_shutdown(deadline):
+        print(strings["command_failed_message"], file=sys.stderr)
+        return 1
+    print(texts.format_scheduled(deadline, now, args.language))
+    return 0
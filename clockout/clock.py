@@ -0,0 +1,80 @@
+# Following the clock: deadlines that survive suspend and clock changes,
+# and the timerfd that reports when the clock is set
+import os
+import time
+from datetime import datetime
+
+from clockout.libc import libc_error, load_libc
+
+
+class Deadline:
+    # A shutdown deadline that stays right across suspend and clock changes.
+    # Times of day follow the wall clock; durations follow elapsed time, so
+    # they move along when the clock is stepped.
+    def __init__(self, timestamp, follows_wall_clock):
+        self.timestamp = timestamp
+        self.follows_wall_clock = follows_wall_clock
+        self.clock_offset = self.read_clock_offset()
+
+    def read_clock_offset(self):
+        # CLOCK_BOOTTIME keeps counting during suspend, so the offset only
+        # changes when the wall clock itself is set
+        return time.time() - time.clock_gettime(time.CLOCK_BOOTTIME)
+
+    def resync(self):
+        # Returns how far the clock was stepped since the last call (0.0 if
+        # it wasn't), and moves duration deadlines along with it
+        offset = self.read_clock_offset()
+        jump = offset - self.clock_offset
+        self.clock_offset = offset
+        if abs(jump) < 1:
+            return 0.0
+        if not self.follows_wall_clock:
+            self.timestamp += jump
+        return jump
+
+    def remaining(self):
+        return self.timestamp - time.time()
+
+    def as_datetime(self):
+        return datetime.fromtimestamp(self.timestamp)
+
+
+# timerfd(2) flags, for Pythons without os.timerfd_create (before 3.13)
+TFD_TIMER_ABSTIME = 1
+TFD_TIMER_CANCEL_ON_SET = 2
+
+
+def open_clock_watch():
+    # A CLOCK_REALTIME timerfd that turns readable whenever the clock is set;
+    # None only where the kernel or C library has no timerfd at all
+    flags = os.O_NONBLOCK | os.O_CLOEXEC
+    try:
+        if hasattr(os, "timerfd_create"):
+            fd = os.timerfd_create(time.CLOCK_REALTIME, flags=flags)
+        else:
+            fd = load_libc().timerfd_create(time.CLOCK_REALTIME, flags)
+            if fd < 0:
+                raise libc_error()
+    except (AttributeError, OSError):
+        return None
+    try:
+        arm_clock_watch(fd)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def arm_clock_watch(fd):
+    # Has to be re-armed after every clock change it reported
+    initial = int(time.time()) + 10 * 365 * 86400
+    flags = TFD_TIMER_ABSTIME | TFD_TIMER_CANCEL_ON_SET
+    if hasattr(os, "timerfd_settime"):
+        os.timerfd_settime(fd, flags=flags, initial=initial)
+        return
+    import ctypes
+    # struct itimerspec: it_interval, then it_value, as (tv_sec, tv_nsec)
+    spec = (ctypes.c_long * 4)(0, 0, initial, 0)
+    if load_libc().timerfd_settime(fd, flags, spec, None) < 0:
+        raise libc_error()
@@ -0,0 +1,353 @@
+# What a ClockOut window has pending and how it gets there: scheduling by
+# time, duration or trigger, the countdown, postponing while busy, clock
+# changes and the live preview. Shared by all windows; each one builds its
+# own widgets and names its language, a key of texts.TEXTS. Uses GLib, but
+# never imports GTK.
+import math
+import os
+import time
+from datetime import datetime
+
+from gi.repository import GLib, Gio
+
+from clockout import backend, clock, parsing, pressure, processes, schedule, texts, triggers
+
+# Typing pause before the deadline preview updates
+PREVIEW_DELAY_MS = 150
+
+
+class ShutdownController:
+    # progress, label_rate and check_postpone are optional, the mini windows
+    # have none of them
+    def __init__(self, language, label_status, check_keep, progress=None, label_rate=None, check_postpone=None):
+        self.language = language
+        self.strings = texts.TEXTS[language]
+        self.label_status = label_status
+        self.check_keep = check_keep
+        self.progress = progress
+        self.label_rate = label_rate
+        self.check_postpone = check_postpone
+        self.scheduler = backend.Scheduler()
+        self.process_index = processes.ProcessIndex()
+        self.trigger_watch = None
+        self.pressure_guard = triggers.PressureGuard(self.on_postponed, *pressure.postpone_settings())
+        self.preview_timeout_id = None
+        self.status_text = ""
+        self.progress_timeout_id = None
+        self.total_seconds = 0
+        self.deadline = None
+        self.clock_watch_fd = None
+        self.clock_watch_id = None
+        self.countdown_visible = True
+        self.progress_wakeups = 0
+        self.progress_started = time.monotonic()
+
+    def start(self):
+        # Follow suspend/resume and clock changes without polling
+        self.clock_watch_fd = clock.open_clock_watch()
+        if self.clock_watch_fd is not None:
+            self.clock_watch_id = GLib.unix_fd_add_full(
+                GLib.PRIORITY_DEFAULT, self.clock_watch_fd, GLib.IOCondition.IN, self.on_clock_changed
+            )
+        self.scheduler.watch_sleep(self.on_clock_event)
+
+        # Pick up a shutdown that is still pending from an earlier run
+        deadline = schedule.read_scheduled_shutdown()
+        if deadline:
+            self.restore_shutdown(deadline, False)
+        self.scheduler.query_timer(lambda deadline: self.restore_shutdown(deadline, True))
+
+    def preview_later(self, mode, text):
+        # Debounced, a burst of keystrokes is parsed only once
+        self.stop_preview()
+        self.preview_timeout_id = GLib.timeout_add(PREVIEW_DELAY_MS, self.show_preview, mode, text)
+
+    def stop_preview(self):
+        if self.preview_timeout_id:
+            GLib.source_remove(self.preview_timeout_id)
+            self.preview_timeout_id = None
+
+    def show_preview(self, mode, text):
+        # mode: "time", "duration" or "trigger", like schedule()
+        self.preview_timeout_id = None
+        now = datetime.now()
+        try:
+            if mode == "time":
+                preview = texts.format_preview(parsing.parse_time(text, now), now, self.language)
+            elif mode == "duration":
+                preview = texts.format_preview(parsing.parse_duration(text, now), now, self.language)
+            else:
+                trigger = parsing.parse_trigger(text, self.process_index)
+                preview = self.strings["preview"].format(texts.describe_trigger(trigger, self.language))
+        except ValueError:
+            self.label_status.set_text(self.status_text)
+            return False
+        self.label_status.set_text(preview)
+        return False
+
+    def set_status(self, text):
+        # Remembered so the label can go back to it after a preview
+        self.status_text = text
+        self.label_status.set_text(text)
+
+    def schedule(self, mode, text):
+        self.stop_preview()
+        self.stop_trigger()
+        if mode == "time":
+            self.schedule_by_time(text)
+        elif mode == "duration":
+            self.schedule_by_duration(text)
+        else:
+            self.schedule_by_trigger(text)
+
+    def schedule_by_time(self, text):
+        try:
+            now = datetime.now()
+            shutdown_datetime = parsing.parse_time(text, now)
+        except ValueError:
+            self.show_error(self.strings["invalid_input"], self.strings["invalid_time"])
+            return
+        self.total_seconds = max(1, int(shutdown_datetime.timestamp() - now.timestamp()))
+        self.start_progress(shutdown_datetime)
+        self.execute_shutdown(shutdown_datetime, texts.format_time_string(self.total_seconds, self.language))
+
+    def schedule_by_duration(self, text):
+        try:
+            now = datetime.now()
+            shutdown_datetime = parsing.parse_duration(text, now)
+        except ValueError:
+            self.show_error(self.strings["invalid_input"], self.strings["invalid_duration"])
+            return
+        self.total_seconds = max(1, int(shutdown_datetime.timestamp() - now.timestamp()))
+        self.start_progress(shutdown_datetime, False)
+        self.execute_shutdown(shutdown_datetime, texts.format_datetime_string(shutdown_datetime, now, self.language))
+
+    def schedule_by_trigger(self, text):
+        # The rate and its estimate only where there is a label for them
+        on_sample = self.on_trigger_sample if self.label_rate else None
+        try:
+            trigger = parsing.parse_trigger(text, self.process_index)
+            self.trigger_watch = triggers.start_watch(trigger, self.on_trigger_fired, on_sample, self.on_trigger_failed)
+        except (ValueError, OSError):
+            self.show_error(self.strings["invalid_input"], self.strings["invalid_trigger"])
+            return
+
+        # Waiting replaces a shutdown that was set by time
+        if self.scheduler.shutdown_scheduled:
+            self.scheduler.cancel()
+        self.stop_progress()
+        self.set_status(self.strings["waiting"].format(texts.describe_trigger(trigger, self.language)))
+
+    def on_trigger_fired(self):
+        self.trigger_watch = None
+        self.hide_rate()
+        shutdown_datetime = schedule.deadline_after(schedule.TRIGGER_GRACE)
+        self.total_seconds = schedule.TRIGGER_GRACE
+        self.start_progress(shutdown_datetime, False)
+        self.execute_shutdown(shutdown_datetime, texts.format_time_string(self.total_seconds, self.language))
+
+    def on_trigger_failed(self, message):
+        # The idle watch only finds out later that logind can't be asked
+        self.trigger_watch = None
+        self.hide_rate()
+        self.show_error(self.strings["trigger_failed"], self.strings["trigger_failed_message"].format(message))
+
+    def on_trigger_sample(self, idle):
+        # Smoothed rate and, once in sight, when the transfer should be done
+        text = texts.format_rate(idle.meter.rate or 0)
+        remaining = idle.predict()
+        if remaining is not None:
+            text += self.strings["rate_done"].format(datetime.fromtimestamp(time.time() + remaining))
+        self.label_rate.set_text(text)
+        self.label_rate.show()
+
+    def stop_trigger(self):
+        if self.trigger_watch:
+            self.trigger_watch.stop()
+            self.trigger_watch = None
+        self.hide_rate()
+
+    def hide_rate(self):
+        if self.label_rate:
+            self.label_rate.hide()
+
+    def start_progress(self, end_time, follows_wall_clock=True):
+        # The deadline is tracked with or without a bar, so clock changes
+        # still move the shutdown
+        self.deadline = clock.Deadline(end_time.timestamp(), follows_wall_clock)
+        if self.progress is None:
+            return
+        self.progress.set_fraction(1.0)
+        self.progress.set_show_text(False)
+        self.progress.show()
+        self.progress_wakeups = 0
+        self.progress_started = time.monotonic()
+        self.schedule_progress_tick()
+
+    def stop_progress(self):
+        self.deadline = None
+        self.pressure_guard.stop()
+        if self.progress:
+            self.progress.hide()
+        self.stop_progress_tick()
+
+    def stop_progress_tick(self):
+        if self.progress_timeout_id:
+            GLib.source_remove(self.progress_timeout_id)
+            self.progress_timeout_id = None
+
+    def schedule_progress_tick(self):
+        # Only wake up when the bar would move by at least one pixel
+        self.stop_progress_tick()
+        if self.deadline is None or self.progress is None or not self.countdown_visible:
+            return
+        remaining = self.deadline.remaining()
+        seconds_per_pixel = self.total_seconds / max(1, self.progress.get_allocated_width())
+        delay = remaining % seconds_per_pixel if remaining > 0 else 0
+        self.progress_timeout_id = GLib.timeout_add_seconds(max(1, math.ceil(delay)), self.update_progress)
+
+    def update_progress(self):
+        self.progress_timeout_id = None
+        if self.progress is None:
+            return False
+        self.progress_wakeups += 1
+
+        # Without a clock watch, clock changes are picked up here instead
+        if self.clock_watch_fd is None and self.deadline.resync():
+            self.scheduler.reschedule(self.deadline.as_datetime())
+            self.refresh_status()
+
+        remaining = self.deadline.remaining()
+        if remaining <= 0:
+            self.progress.set_fraction(0.0)
+            self.stop_progress()
+            return False
+
+        progress = 1 - (self.total_seconds - remaining) / self.total_seconds
+        self.progress.set_fraction(max(0.0, progress))
+        self.schedule_progress_tick()
+        return False
+
+    def set_countdown_visible(self, visible):
+        # Pause the countdown while the window can't be seen, resync on map
+        self.countdown_visible = visible
+        if not visible:
+            self.stop_progress_tick()
+        elif self.deadline:
+            self.update_progress()
+        return False
+
+    def on_clock_changed(self, fd, condition):
+        # The timerfd reports a clock change by failing the read
+        try:
+            os.read(fd, 8)
+        except OSError:
+            clock.arm_clock_watch(fd)
+        self.on_clock_event()
+        return True
+
+    def stop_clock_watch(self):
+        if self.clock_watch_id:
+            GLib.source_remove(self.clock_watch_id)
+            self.clock_watch_id = None
+        if self.clock_watch_fd is not None:
+            os.close(self.clock_watch_fd)
+            self.clock_watch_fd = None
+
+    def on_clock_event(self):
+        # Fix the deadline once and resync bar and message right away
+        if self.deadline is None:
+            return
+        if self.deadline.resync():
+            self.scheduler.reschedule(self.deadline.as_datetime())
+            self.pressure_guard.arm(self.deadline.timestamp)
+        self.refresh_status()
+        self.update_progress()
+
+    def refresh_status(self):
+        if not self.scheduler.shutdown_scheduled:
+            return
+        if self.deadline.follows_wall_clock:
+            self.set_status(texts.format_time_string(max(0, int(self.deadline.remaining())), self.language))
+        else:
+            self.set_status(texts.format_datetime_string(self.deadline.as_datetime(), datetime.now(), self.language))
+
+    def progress_wakeups_per_hour(self):
+        hours = (time.monotonic() - self.progress_started) / 3600
+        return self.progress_wakeups / hours if hours else 0.0
+
+    def execute_shutdown(self, shutdown_datetime, shutdown_str):
+        self.pressure_guard.stop()
+        if self.check_postpone and self.check_postpone.get_active():
+            self.pressure_guard.start(shutdown_datetime.timestamp())
+        self.scheduler.schedule(
+            shutdown_datetime,
+            self.check_keep.get_active(),
+            lambda error: self.on_shutdown_executed(error, shutdown_str)
+        )
+
+    def on_shutdown_executed(self, error, shutdown_str):
+        if error:
+            self.show_error(self.strings["command_failed"], self.strings["command_failed_message"])
+            return
+        self.set_status(shutdown_str)
+        self.send_notification(self.strings["scheduled_title"], shutdown_str.replace("✅ ", "").replace("\n", "").strip())
+
+    def on_postponed(self, seconds):
+        # Still busy shortly before the deadline: move it back one step
+        if self.deadline is None or not self.scheduler.shutdown_scheduled:
+            return
+        self.deadline.timestamp += seconds
+        self.total_seconds += seconds
+        deadline = self.deadline.as_datetime()
+        self.scheduler.reschedule(deadline)
+        self.pressure_guard.arm(self.deadline.timestamp)
+        self.progress.set_text(f"+{self.pressure_guard.postponed // 60} min")
+        self.progress.set_show_text(True)
+        self.update_progress()
+        message = self.strings["postponed"].format(deadline)
+        self.set_status("⏸️ " + message)
+        self.send_notification(self.strings["postponed_title"], message)
+
+    def show_error(self, text, notification_msg):
+        # Invalid input cancels the pending shutdown as well
+        if self.scheduler.shutdown_scheduled:
+            self.scheduler.cancel()
+            text = self.strings["canceled"] + "\n" + "❌ " + text.split(" ", 1)[-1]
+            notification_msg = self.strings["canceled_prefix"] + notification_msg
+
+        self.set_status(text)
+        self.send_notification(self.strings["error_title"], notification_msg)
+        self.stop_progress()
+
+    def restore_shutdown(self, deadline, timer):
+        if not self.scheduler.restore(deadline, timer):
+            return
+        self.check_keep.set_active(timer)
+        self.total_seconds = max(1, int(deadline.timestamp() - time.time()))
+        self.start_progress(deadline)
+        self.set_status(texts.format_datetime_string(deadline, datetime.now(), self.language))
+
+    def close(self):
+        # The window is gone: a shutdown that isn't kept is canceled with it
+        self.stop_preview()
+        self.stop_trigger()
+        if self.scheduler.shutdown_scheduled and not self.scheduler.timer_scheduled:
+            self.scheduler.cancel()
+            self.send_notification(self.strings["canceled_title"], self.strings["canceled_message"])
+        if os.environ.get("CLOCKOUT_WAKEUP_STATS"):
+            print(f"Countdown wakeups per hour: {self.progress_wakeups_per_hour():.1f}")
+        self.stop_progress_tick()
+        self.pressure_guard.stop()
+        self.stop_clock_watch()
+        # Keep the application alive until the cancel has gone through
+        application = Gio.Application.get_default()
+        application.hold()
+        self.scheduler.after_commands(application.release)
+
+    def send_notification(self, title, message):
+        self.scheduler.notify(title, message, self.on_notification_sent)
+
+    def on_notification_sent(self, error):
+        if error:
+            print(self.strings["notification_failed"].format(error))
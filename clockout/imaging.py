@@ -0,0 +1,21 @@
+# Pixel data of the window images, without GdkPixbuf
+
+# Lookup table mapping every byte value to its inverse
+INVERT_TABLE = bytes(range(255, -1, -1))
+
+
+def invert_pixels(pixels, width, rowstride, n_channels, has_alpha):
+    # Inverted copy of 8-bit RGB(A) pixel data; alpha and the rowstride
+    # padding keep their original bytes
+    row_length = width * n_channels
+    inverted = bytearray(pixels.translate(INVERT_TABLE))
+    if rowstride == row_length:
+        if has_alpha:
+            inverted[3::n_channels] = pixels[3::n_channels]
+        return inverted
+    for start in range(0, len(pixels), rowstride):
+        end = start + row_length
+        if has_alpha:
+            inverted[start + 3:end:n_channels] = pixels[start + 3:end:n_channels]
+        inverted[end:start + rowstride] = pixels[end:start + rowstride]
+    return inverted
@@ -0,0 +1,148 @@
+# The dir trigger: a directory tree without writes for a while, watched
+# through inotify(7)
+import os
+import struct
+import time
+
+from clockout.libc import libc_error, load_libc
+
+# Unfinished browser and download manager files
+PARTIAL_SUFFIXES = (".part", ".crdownload", ".download", ".partial", ".!qb")
+
+# inotify(7) constants and the fixed part of struct inotify_event
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_DONT_FOLLOW = 0x2000000
+IN_EXCL_UNLINK = 0x4000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = os.O_CLOEXEC
+IN_NONBLOCK = os.O_NONBLOCK
+DIRECTORY_EVENTS = (
+    IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def is_partial(name):
+    return name.endswith(PARTIAL_SUFFIXES)
+
+
+class DirectoryQuiet:
+    # "no writes or renames below path for hold seconds and no partial
+    # downloads left". The tree is walked once when armed, after that only
+    # directories that appear are walked; the rest comes from inotify.
+    def __init__(self, path, hold):
+        self.libc = load_libc()
+        self.path = path
+        self.hold = hold
+        self.directories = {}
+        self.partials = set()
+        self.buffer = bytearray(65536)
+        if not os.path.isdir(path):
+            raise ValueError(f"no such directory: {path}")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise libc_error()
+        try:
+            self.add_tree(path, strict=True)
+        except OSError:
+            self.close()
+            raise
+        self.last_change = time.monotonic()
+
+    def add_tree(self, root, strict=False):
+        # Watch root and every directory below it, note partial files;
+        # strict: fail if a watch can't be added (e.g. max_user_watches)
+        pending = [root]
+        while pending:
+            directory = pending.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), DIRECTORY_EVENTS)
+            if wd < 0:
+                if strict:
+                    raise libc_error(directory)
+                continue
+            self.directories[wd] = directory
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif is_partial(entry.name):
+                            self.partials.add(entry.path)
+            except OSError:
+                continue
+
+    def drop_tree(self, root):
+        # A directory moved away: stop watching it and what was below it
+        prefix = root + os.sep
+        for wd, directory in list(self.directories.items()):
+            if directory == root or directory.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.directories[wd]
+        self.partials = {path for path in self.partials if not path.startswith(prefix)}
+
+    def read_events(self, now=None):
+        # Drains the inotify fd; call when it is readable
+        while True:
+            try:
+                length = os.readv(self.fd, [self.buffer])
+            except BlockingIOError:
+                return
+            if length <= 0:
+                return
+            self.last_change = time.monotonic() if now is None else now
+            offset = 0
+            while offset < length:
+                wd, mask, _, name_length = INOTIFY_EVENT.unpack_from(self.buffer, offset)
+                offset += INOTIFY_EVENT.size
+                # Plain writes are the bulk of the events, they need no name
+                if mask & (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_IGNORED | IN_Q_OVERFLOW):
+                    name = bytes(self.buffer[offset:offset + name_length]).rstrip(b"\0")
+                    self.handle(wd, mask, os.fsdecode(name))
+                offset += name_length
+
+    def handle(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost: walk again (existing watches are kept)
+            self.partials.clear()
+            self.add_tree(self.path)
+            return
+        if mask & IN_IGNORED:
+            self.directories.pop(wd, None)
+            return
+        directory = self.directories.get(wd)
+        if directory is None:
+            return
+        path = os.path.join(directory, name)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(path)
+            elif mask & IN_MOVED_FROM:
+                self.drop_tree(path)
+        elif is_partial(name):
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self.partials.add(path)
+            else:
+                self.partials.discard(path)
+
+    def remaining(self, now=None):
+        # Seconds until the tree counts as quiet, 0 once it is; with partial
+        # files left a full hold, their removal is an event of its own
+        now = time.monotonic() if now is None else now
+        if self.partials:
+            return self.hold
+        return max(0.0, self.hold - (now - self.last_change))
+
+    def close(self):
+        if self.fd is not None and self.fd >= 0:
+            os.close(self.fd)
+        self.fd = None
+        self.directories.clear()
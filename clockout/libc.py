@@ -0,0 +1,17 @@
+# Linux calls the os module lacks (timerfd before Python 3.13, inotify)
+import functools
+import os
+
+
+@functools.lru_cache(maxsize=None)
+def load_libc():
+    # The C library, for the Linux calls the os module lacks; ctypes is
+    # only imported when one of them is needed
+    import ctypes
+    return ctypes.CDLL(None, use_errno=True)
+
+
+def libc_error(*args):
+    import ctypes
+    error = ctypes.get_errno()
+    return OSError(error, os.strerror(error), *args)
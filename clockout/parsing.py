@@ -0,0 +1,151 @@
+# What the user types: times of day, durations and triggers
+import os
+import re
+from datetime import datetime, timedelta
+from datetime import time as dt_time
+
+# "23:15", "23:15 tomorrow" or "2026-10-20 23:00"
+TIME_PATTERN = re.compile(
+    r"\s*(?:(\d{4})-(\d{1,2})-(\d{1,2})\s+)?(\d{1,2}):(\d{2})(?:\s+(tomorrow|morgen))?\s*",
+    re.IGNORECASE,
+)
+
+# "90" (minutes), "1:30" (hours:minutes) or units like "1h30m" and "45s"
+DURATION_PATTERN = re.compile(
+    r"\s*(?:(\d+)|(\d+):(\d{1,2})|(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?\s*(?:(\d+)\s*s)?)\s*",
+    re.IGNORECASE,
+)
+
+
+def parse_time(text, now):
+    # A time of day, today or tomorrow if that time has already passed;
+    # cheap enough to run on every keystroke
+    match = TIME_PATTERN.fullmatch(text)
+    if not match:
+        raise ValueError(f"invalid time: {text!r}")
+    year, month, day, hour, minute, tomorrow = match.groups()
+    if year:
+        if tomorrow:
+            raise ValueError(f"invalid time: {text!r}")
+        deadline = datetime(int(year), int(month), int(day), int(hour), int(minute))
+        if deadline <= now:
+            raise ValueError(f"time is in the past: {text!r}")
+        return deadline
+
+    deadline = datetime.combine(now.date(), dt_time(int(hour), int(minute)))
+    if tomorrow or deadline < now:
+        deadline += timedelta(days=1)
+    return deadline
+
+
+def parse_duration(text, now):
+    # Minutes (MM), hours and minutes (HH:MM) or h/m/s units
+    match = DURATION_PATTERN.fullmatch(text)
+    if not match or not any(match.groups()):
+        raise ValueError(f"invalid duration: {text!r}")
+    minutes, clock_hours, clock_minutes, hours, unit_minutes, seconds = match.groups()
+    if minutes:
+        total_seconds = int(minutes) * 60
+    elif clock_hours:
+        if int(clock_minutes) >= 60:
+            raise ValueError(f"invalid duration: {text!r}")
+        total_seconds = int(clock_hours) * 3600 + int(clock_minutes) * 60
+    else:
+        total_seconds = int(hours or 0) * 3600 + int(unit_minutes or 0) * 60 + int(seconds or 0)
+
+    if total_seconds <= 0:
+        raise ValueError(f"invalid duration: {text!r}")
+    # Via the timestamp, so a DST change in between is counted correctly
+    try:
+        return datetime.fromtimestamp(now.timestamp() + total_seconds)
+    except (OverflowError, OSError):
+        raise ValueError(f"duration too long: {text!r}") from None
+
+
+# Network idle trigger: "net [IFACE] [N KB/s] [M min]"
+NETWORK_DEFAULT_KBPS = 50
+NETWORK_DEFAULT_MINUTES = 10
+
+NETWORK_PATTERN = re.compile(
+    r"\s*net(?:work)?"
+    r"(?:\s+(?!(?:below|under|for)\b)([A-Za-z][\w.:@-]*))?"
+    r"(?:\s+(?:<\s*|below\s+|under\s+)?(\d+)\s*kb/s)?"
+    r"(?:\s+(?:for\s+)?(\d+)\s*m(?:in)?)?\s*",
+    re.IGNORECASE,
+)
+
+
+# Disk idle trigger: "disk [DEV ...] [N MB/s] [M min] [sync]"
+DISK_DEFAULT_MBPS = 1
+DISK_DEFAULT_MINUTES = 2
+
+DISK_PATTERN = re.compile(
+    r"\s*disks?"
+    r"((?:\s+(?!(?:below|under|for|sync)\b)[A-Za-z][\w.-]*)*)"
+    r"(?:\s+(?:<\s*|below\s+|under\s+)?(\d+)\s*mb/s)?"
+    r"(?:\s+(?:for\s+)?(\d+)\s*m(?:in)?)?"
+    r"(\s+sync)?\s*",
+    re.IGNORECASE,
+)
+
+
+# Directory quiet trigger: "dir PATH [M min]"
+DIRECTORY_DEFAULT_MINUTES = 5
+
+DIRECTORY_PATTERN = re.compile(
+    r"\s*dir(?:ectory)?\s+(.+?)(?:\s+(?:for\s+)?(\d+)\s*m(?:in)?)?\s*",
+    re.IGNORECASE,
+)
+
+
+# User idle trigger: "idle [M min]"
+IDLE_DEFAULT_MINUTES = 15
+
+IDLE_PATTERN = re.compile(r"\s*idle(?:\s+(?:for\s+)?(\d+)\s*m(?:in)?)?\s*", re.IGNORECASE)
+
+
+def parse_processes(text, index):
+    # PIDs and/or process names ("1234 wget"), all of which must match
+    pids = set()
+    for word in text.replace(",", " ").split():
+        if word.isdigit():
+            if not os.path.exists(f"/proc/{word}"):
+                raise ValueError(f"no such process: {word}")
+            pids.add(int(word))
+        else:
+            matches = index.lookup(word)
+            if not matches:
+                raise ValueError(f"no such process: {word!r}")
+            pids.update(matches)
+    if not pids:
+        raise ValueError("no process given")
+    return sorted(pids)
+
+
+def parse_trigger(text, index):
+    # ("network", interface or None, bytes/s, seconds),
+    # ("disk", devices, bytes/s, seconds, sync), ("directory", path, seconds),
+    # ("idle", seconds) or ("process", pids)
+    match = NETWORK_PATTERN.fullmatch(text)
+    if match:
+        interface, rate, minutes = match.groups()
+        rate = int(rate or NETWORK_DEFAULT_KBPS) * 1000
+        minutes = int(minutes or NETWORK_DEFAULT_MINUTES)
+        return ("network", interface, rate, minutes * 60)
+    match = DISK_PATTERN.fullmatch(text)
+    if match:
+        devices, rate, minutes, sync = match.groups()
+        rate = int(rate or DISK_DEFAULT_MBPS) * 1000000
+        minutes = int(minutes or DISK_DEFAULT_MINUTES)
+        return ("disk", tuple(devices.split()), rate, minutes * 60, bool(sync))
+    match = IDLE_PATTERN.fullmatch(text)
+    if match:
+        return ("idle", int(match[1] or IDLE_DEFAULT_MINUTES) * 60)
+    match = DIRECTORY_PATTERN.fullmatch(text)
+    if match:
+        # Resolved, the watches do not follow symlinks (~/Downloads may be one)
+        path = os.path.realpath(os.path.expanduser(match[1].strip("\"'")))
+        if not os.path.isdir(path):
+            raise ValueError(f"no such directory: {path}")
+        return ("directory", path, int(match[2] or DIRECTORY_DEFAULT_MINUTES) * 60)
+    return ("process", parse_processes(text, index))
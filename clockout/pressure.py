@@ -0,0 +1,56 @@
+# Pressure stall information (PSI): postpone a due shutdown while the
+# system is saturated
+import os
+
+PRESSURE_DIRECTORY = "/proc/pressure"
+PRESSURE_RESOURCES = ("cpu", "io", "memory")
+# PSI trigger window; unprivileged triggers need a multiple of 2 s
+PRESSURE_WINDOW_US = 2000000
+# A trigger reports at most once per window, so this means "still busy"
+PRESSURE_RECENT_SECONDS = 10
+# Seconds before the deadline at which the guard decides
+POSTPONE_LEAD_SECONDS = 30
+# Defaults, overridden by CLOCKOUT_POSTPONE_STEP / _MAX (minutes) and
+# CLOCKOUT_PRESSURE (percent of the window stalled)
+POSTPONE_DEFAULT_STEP_MINUTES = 10
+POSTPONE_DEFAULT_MAX_MINUTES = 60
+PRESSURE_DEFAULT_PERCENT = 40
+
+
+def postpone_settings(environ=os.environ):
+    # (step seconds, maximum seconds, stall percent)
+    def read(name, default, limit):
+        try:
+            value = int(environ.get(name, default))
+        except ValueError:
+            return default
+        return value if 0 < value <= limit else default
+    return (
+        read("CLOCKOUT_POSTPONE_STEP", POSTPONE_DEFAULT_STEP_MINUTES, 24 * 60) * 60,
+        read("CLOCKOUT_POSTPONE_MAX", POSTPONE_DEFAULT_MAX_MINUTES, 7 * 24 * 60) * 60,
+        read("CLOCKOUT_PRESSURE", PRESSURE_DEFAULT_PERCENT, 100),
+    )
+
+
+def pressure_supported(directory=PRESSURE_DIRECTORY):
+    return os.path.exists(os.path.join(directory, PRESSURE_RESOURCES[0]))
+
+
+def open_pressure_triggers(percent, directory=PRESSURE_DIRECTORY):
+    # One PSI trigger per resource, {fd: resource}: the fd turns POLLPRI
+    # whenever some task stalled for more than percent of a window. Empty
+    # without PSI or without permission (before Linux 6.5: CAP_SYS_RESOURCE).
+    stall = PRESSURE_WINDOW_US * percent // 100
+    fds = {}
+    for resource in PRESSURE_RESOURCES:
+        try:
+            fd = os.open(os.path.join(directory, resource), os.O_RDWR | os.O_NONBLOCK | os.O_CLOEXEC)
+        except OSError:
+            continue
+        try:
+            os.write(fd, f"some {stall} {PRESSURE_WINDOW_US}\0".encode())
+        except OSError:
+            os.close(fd)
+            continue
+        fds[fd] = resource
+    return fds
@@ -0,0 +1,47 @@
+# Processes a trigger waits for: found by name in /proc, watched through
+# pidfds
+import os
+import time
+
+
+class ProcessIndex:
+    # Process names (comm) to PIDs, read from /proc only when a lookup needs
+    # it and reused for a moment, so typing a name doesn't rescan each time
+    def __init__(self, max_age=2.0):
+        self.max_age = max_age
+        self.built = None
+        self.names = {}
+
+    def lookup(self, name):
+        if self.built is None or time.monotonic() - self.built > self.max_age:
+            self.rebuild()
+        # The kernel cuts comm to 15 characters
+        return self.names.get(name[:15], [])
+
+    def rebuild(self):
+        names = {}
+        own_pid = os.getpid()
+        with os.scandir("/proc") as it:
+            for entry in it:
+                if not entry.name.isdigit() or int(entry.name) == own_pid:
+                    continue
+                try:
+                    with open(f"/proc/{entry.name}/comm") as f:
+                        names.setdefault(f.read().rstrip("\n"), []).append(int(entry.name))
+                except OSError:
+                    continue
+        self.names = names
+        self.built = time.monotonic()
+
+
+def open_pidfd(pid):
+    # A pidfd turns readable when the process exits; None if it is already
+    # gone, OSError (or AttributeError before Python 3.9) without support
+    try:
+        return os.pidfd_open(pid)
+    except ProcessLookupError:
+        return None
+
+
+def process_alive(pid):
+    return os.path.exists(f"/proc/{pid}")
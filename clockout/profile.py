@@ -0,0 +1,78 @@
+# Opt-in launch timing: --profile-startup[=PATH] or CLOCKOUT_PROFILE_STARTUP;
+# only the standard library, so the scripts can start it before GTK
+import json
+import os
+import platform
+import sys
+import time
+
+PROFILE_OPTION = "--profile-startup"
+PROFILE_VARIABLE = "CLOCKOUT_PROFILE_STARTUP"
+
+
+class StartupProfile:
+    # Monotonic timestamps of the launch phases, written as JSON once the
+    # first frame is up; every call is a no-op unless profiling is enabled
+    def __init__(self, target=None):
+        self.target = target
+        self.enabled = target is not None
+        self.started = time.monotonic()
+        self.process_age = self.read_process_age() if self.enabled else None
+        self.phases = []
+
+    @classmethod
+    def from_arguments(cls, argv):
+        # Takes the option out of argv, so it is not mistaken for "at"/"in"
+        target = os.environ.get(PROFILE_VARIABLE)
+        for arg in list(argv[1:]):
+            if arg == PROFILE_OPTION or arg.startswith(PROFILE_OPTION + "="):
+                target = arg.partition("=")[2]
+                argv.remove(arg)
+        return cls(target)
+
+    def read_process_age(self):
+        # Seconds since exec, i.e. interpreter startup before the profile began
+        try:
+            with open("/proc/self/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            start = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+            return round(time.clock_gettime(time.CLOCK_BOOTTIME) - start, 6)
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def mark(self, phase):
+        if self.enabled:
+            self.phases.append((phase, time.monotonic()))
+
+    def report(self):
+        phases = []
+        previous = self.started
+        for phase, timestamp in self.phases:
+            phases.append({
+                "phase": phase,
+                "at": round(timestamp - self.started, 6),
+                "took": round(timestamp - previous, 6),
+            })
+            previous = timestamp
+        return {
+            "program": os.path.basename(sys.argv[0]),
+            "python": platform.python_version(),
+            "process_age_at_start": self.process_age,
+            "total": round(previous - self.started, 6),
+            "phases": phases,
+        }
+
+    def write(self):
+        # An empty target or "1" means stderr, anything else is a file path
+        if not self.enabled:
+            return
+        self.enabled = False
+        report = json.dumps(self.report(), indent=2)
+        if self.target in ("", "1"):
+            print(report, file=sys.stderr)
+            return
+        try:
+            with open(self.target, "w") as f:
+                f.write(report + "\n")
+        except OSError as e:
+            print(f"Error writing startup profile: {e}", file=sys.stderr)
@@ -0,0 +1,256 @@
+# Network and disk throughput sampled from /proc, smoothed into a rate and
+# checked against a threshold for the net and disk triggers
+import math
+import os
+import re
+import time
+
+NETDEV_FILE = "/proc/net/dev"
+ROUTE_FILE = "/proc/net/route"
+# Seconds between samples and of the rate's exponential smoothing
+NETWORK_SAMPLE_SECONDS = 5
+NETWORK_TIME_CONSTANT = 30
+
+# Received bytes, seven more receive fields, transmitted bytes
+NETDEV_FIELDS = re.compile(rb"\s*(\d+)(?:\s+\d+){7}\s+(\d+)")
+
+
+class ProcReader:
+    # A /proc file that stays open and is read into the same buffer every
+    # time, so sampling it creates next to no objects
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        self.buffer = bytearray(16384)
+        self.length = 0
+
+    def read(self):
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        self.length = os.readv(self.fd, [self.buffer])
+        while self.length == len(self.buffer):
+            # Grown past the buffer (many entries): make room, read again
+            self.buffer.extend(bytes(len(self.buffer)))
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            self.length = os.readv(self.fd, [self.buffer])
+
+    def match(self, key, fields):
+        # fields matched right after key, where key starts a word
+        start = self.buffer.find(key, 0, self.length)
+        while start > 0 and self.buffer[start - 1] not in b" \n":
+            start = self.buffer.find(key, start + 1, self.length)
+        if start < 0:
+            return None
+        return fields.match(self.buffer, start + len(key), self.length)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class RateMeter:
+    # Exponentially smoothed rate of a growing counter, plus its trend
+    # (change of the rate per second) for a rough forecast
+    def __init__(self, time_constant):
+        self.time_constant = time_constant
+        self.rate = None
+        self.trend = 0.0
+        self.last_value = None
+        self.last_time = None
+
+    def update(self, value, now):
+        if self.last_value is None or now <= self.last_time:
+            self.last_value, self.last_time = value, now
+            return self.rate
+        elapsed = now - self.last_time
+        # A counter that went backwards (reset, wrap) counts as no traffic
+        instant = max(0, value - self.last_value) / elapsed
+        weight = 1 - math.exp(-elapsed / self.time_constant)
+        previous = self.rate
+        self.rate = instant if previous is None else previous + weight * (instant - previous)
+        if previous is not None:
+            self.trend += weight * ((self.rate - previous) / elapsed - self.trend)
+        self.last_value, self.last_time = value, now
+        return self.rate
+
+
+class RateIdle:
+    # "counter averaged under threshold per second for hold seconds"
+    def __init__(self, threshold, hold, time_constant):
+        self.meter = RateMeter(time_constant)
+        self.threshold = threshold
+        self.hold = hold
+        self.below_since = None
+
+    def settle(self, value, now, ready=True):
+        # Returns True once the rate has stayed low (and ready) long enough
+        rate = self.meter.update(value, now)
+        if rate is None:
+            return False
+        if rate >= self.threshold or not ready:
+            self.below_since = None
+            return False
+        if self.below_since is None:
+            self.below_since = now
+        return now - self.below_since >= self.hold
+
+    def predict(self, now=None):
+        # Seconds until the trigger fires, None while no end is in sight
+        now = time.monotonic() if now is None else now
+        if self.below_since is not None:
+            return max(0.0, self.hold - (now - self.below_since))
+        if self.meter.rate is None or self.meter.trend >= 0:
+            return None
+        return (self.meter.rate - self.threshold) / -self.meter.trend + self.hold
+
+
+def default_interface(path=ROUTE_FILE):
+    # The interface of the default route, where downloads come in
+    try:
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 1 and fields[1] == "00000000":
+                    return fields[0]
+    except OSError:
+        pass
+    raise ValueError("no default route")
+
+
+class NetDevSampler:
+    # Byte counter of one interface from /proc/net/dev; only the two
+    # counters are turned into objects
+    def __init__(self, interface, path=NETDEV_FILE):
+        self.key = interface.encode() + b":"
+        self.file = ProcReader(path)
+        if self.read_bytes() is None:
+            self.close()
+            raise ValueError(f"no such interface: {interface}")
+
+    def read_bytes(self):
+        # Received plus transmitted bytes, None if the interface is gone
+        self.file.read()
+        match = self.file.match(self.key, NETDEV_FIELDS)
+        if not match:
+            return None
+        return int(match[1]) + int(match[2])
+
+    def close(self):
+        self.file.close()
+
+
+class NetworkIdle(RateIdle):
+    # The interface's traffic under threshold bytes/s for hold seconds
+    def __init__(self, interface, threshold, hold, path=NETDEV_FILE):
+        super().__init__(threshold, hold, NETWORK_TIME_CONSTANT)
+        self.interface = interface or default_interface()
+        self.sampler = NetDevSampler(self.interface, path)
+
+    def sample(self, now=None):
+        now = time.monotonic() if now is None else now
+        value = self.sampler.read_bytes()
+        if value is None:
+            # Interface gone: nothing is coming in any more
+            value = self.meter.last_value or 0
+        return self.settle(value, now)
+
+    def close(self):
+        self.sampler.close()
+
+
+DISKSTATS_FILE = "/proc/diskstats"
+MEMINFO_FILE = "/proc/meminfo"
+BLOCK_DIRECTORY = "/sys/block"
+DISK_SAMPLE_SECONDS = 5
+DISK_TIME_CONSTANT = 15
+# Dirty + Writeback (bytes) still counted as drained
+DISK_DIRTY_LIMIT = 16 * 1024 * 1024
+
+# Reads completed and merged, sectors read, ms reading, writes completed
+# and merged, sectors written
+DISKSTATS_FIELDS = re.compile(rb"\d+\s+\d+\s+(\d+)\s+\d+\s+\d+\s+\d+\s+(\d+)")
+MEMINFO_FIELD = re.compile(rb"\s*(\d+)")
+
+
+def whole_disks(path=BLOCK_DIRECTORY):
+    # Physical disks only: partitions, loop, zram and device mapper
+    # devices would count the same I/O twice or not be disks at all
+    try:
+        disks = sorted(name for name in os.listdir(path) if os.path.exists(os.path.join(path, name, "device")))
+    except OSError:
+        disks = []
+    if not disks:
+        raise ValueError("no disks found")
+    return disks
+
+
+class DiskStatsSampler:
+    # Bytes read plus written on the given block devices
+    def __init__(self, devices, path=DISKSTATS_FILE):
+        self.keys = [device.encode() + b" " for device in devices]
+        self.file = ProcReader(path)
+        self.file.read()
+        for device, key in zip(devices, self.keys):
+            if not self.file.match(key, DISKSTATS_FIELDS):
+                self.close()
+                raise ValueError(f"no such disk: {device}")
+
+    def read_bytes(self):
+        self.file.read()
+        sectors = 0
+        for key in self.keys:
+            match = self.file.match(key, DISKSTATS_FIELDS)
+            if match:
+                sectors += int(match[1]) + int(match[2])
+        # diskstats always counts 512 byte sectors
+        return sectors * 512
+
+    def close(self):
+        self.file.close()
+
+
+class DirtySampler:
+    # Dirty plus Writeback from /proc/meminfo: data that still has to reach
+    # the disks before a shutdown can finish
+    def __init__(self, path=MEMINFO_FILE):
+        self.file = ProcReader(path)
+
+    def read_bytes(self):
+        self.file.read()
+        total = 0
+        for key in (b"Dirty:", b"Writeback:"):
+            match = self.file.match(key, MEMINFO_FIELD)
+            if match:
+                total += int(match[1]) * 1024
+        return total
+
+    def close(self):
+        self.file.close()
+
+
+class DiskIdle(RateIdle):
+    # Disk throughput under threshold bytes/s for hold seconds, with the
+    # dirty page cache drained. sync_due turns True when throughput has
+    # dropped but data is still waiting, i.e. when an early sync helps.
+    def __init__(self, devices, threshold, hold, diskstats=DISKSTATS_FILE, meminfo=MEMINFO_FILE):
+        super().__init__(threshold, hold, DISK_TIME_CONSTANT)
+        self.devices = list(devices) or whole_disks()
+        self.sampler = DiskStatsSampler(self.devices, diskstats)
+        try:
+            self.memory = DirtySampler(meminfo)
+        except OSError:
+            self.sampler.close()
+            raise
+        self.dirty = 0
+        self.sync_due = False
+
+    def sample(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.dirty = self.memory.read_bytes()
+        drained = self.dirty <= DISK_DIRTY_LIMIT
+        fired = self.settle(self.sampler.read_bytes(), now, drained)
+        self.sync_due = not drained and self.meter.rate is not None and self.meter.rate < self.threshold
+        return fired
+
+    def close(self):
+        self.sampler.close()
+        self.memory.close()
@@ -0,0 +1,77 @@
+# The system side of a scheduled shutdown: logind's deadline, the shutdown
+# command's minutes, the systemd timer and what an earlier run left pending
+import time
+from datetime import datetime
+
+# Where systemd keeps the pending shutdown (USEC=, MODE=, ...)
+SCHEDULED_SHUTDOWN_FILE = "/run/systemd/shutdown/scheduled"
+
+
+def read_scheduled_shutdown(path=SCHEDULED_SHUTDOWN_FILE):
+    # Returns the pending power-off as a local datetime, or None
+    # (scheduled reboots are not ours to show or cancel)
+    try:
+        with open(path) as f:
+            fields = dict(line.rstrip("\n").split("=", 1) for line in f if "=" in line)
+        if fields.get("MODE", "poweroff") not in ("poweroff", "halt"):
+            return None
+        return datetime.fromtimestamp(int(fields["USEC"]) / 1000000)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def logind_usec(deadline):
+    # logind takes the deadline in microseconds of CLOCK_REALTIME
+    return int(deadline.timestamp() * 1000000)
+
+
+def split_handoff(deadline, now):
+    # shutdown only takes whole minutes: (milliseconds to wait out on the
+    # monotonic clock first, minutes to hand off after that); now is
+    # time.time()
+    remaining_ms = max(0, int((deadline.timestamp() - now) * 1000))
+    minutes, wait_ms = divmod(remaining_ms, 60000)
+    return wait_ms, minutes
+
+
+# Transient systemd user timer that shuts down without ClockOut running
+TIMER_UNIT = "clockout-shutdown"
+
+
+def timer_schedule_command(deadline):
+    return [
+        "systemd-run", "--user", f"--unit={TIMER_UNIT}",
+        f"--on-calendar={deadline.strftime('%Y-%m-%d %H:%M:%S')}",
+        "--timer-property=AccuracySec=1s",
+        "systemctl", "poweroff",
+    ]
+
+
+def timer_cancel_command():
+    return ["systemctl", "--user", "stop", f"{TIMER_UNIT}.timer"]
+
+
+def timer_query_command():
+    return [
+        "systemctl", "--user", "show", f"{TIMER_UNIT}.timer",
+        "--property=NextElapseUSecRealtime", "--timestamp=unix", "--value",
+    ]
+
+
+def parse_timer_elapse(output):
+    # "@1760908500" for a pending timer, empty or "n/a" otherwise
+    value = output.strip()
+    if not value.startswith("@"):
+        return None
+    try:
+        return datetime.fromtimestamp(int(value[1:]))
+    except ValueError:
+        return None
+
+
+# Seconds between a trigger firing and the shutdown, time enough to cancel
+TRIGGER_GRACE = 60
+
+
+def deadline_after(seconds):
+    return datetime.fromtimestamp(time.time() + seconds)
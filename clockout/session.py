@@ -0,0 +1,24 @@
+# The idle trigger: whether the user has left the session alone
+import time
+
+
+class UserIdle:
+    # Session idle state reported by several sources (logind, screensaver):
+    # idle while any of them says so, counted from the earliest
+    def __init__(self, hold):
+        self.hold = hold
+        self.since = {}
+
+    def update(self, source, idle, since=None):
+        # since: time.monotonic() at which the source went idle, if known
+        if not idle:
+            self.since.pop(source, None)
+        elif source not in self.since or since is not None:
+            self.since[source] = time.monotonic() if since is None else since
+
+    def remaining(self, now=None):
+        # Seconds until the hold is over, None while the user is active
+        if not self.since:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.hold - (now - min(self.since.values())))
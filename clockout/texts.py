@@ -0,0 +1,210 @@
+# Texts shown to the user, one set per language. Every ClockOut window and
+# the command line pick theirs by key: "en_US", "en_EU" or "de". The fixed
+# texts are used as they are, the templates by the format_* functions below.
+import re
+
+ENGLISH = {
+    "invalid_input": "❌ Invalid input!",
+    "invalid_time": "Invalid time! Format: HH:MM, HH:MM tomorrow or YYYY-MM-DD HH:MM",
+    "invalid_duration": "Invalid format! Use minutes (e.g. 90), hours:minutes (e.g. 1:30) or units (e.g. 1h30m, 45s).",
+    "invalid_trigger": "Invalid trigger! Use PIDs, process names (e.g. wget), net [IFACE] [KB/s] [min], disk [DEV] [MB/s] [min] [sync], dir PATH [min] or idle [min].",
+    "trigger_failed": "❌ Trigger failed!",
+    "trigger_failed_message": "Cannot watch user activity: {}",
+    "waiting": "⏳ Waiting for {}.",
+    "rate_done": " · done ≈ {:%H:%M}",
+    "command_failed": "⚠️ Error executing shutdown command!",
+    "command_failed_message": "Error executing shutdown command!",
+    "scheduled_title": "Shutdown scheduled",
+    "postponed": "System busy, shutdown postponed to {:%H:%M}.",
+    "postponed_title": "Shutdown postponed",
+    "canceled": "❌ Shutdown canceled!",
+    "canceled_prefix": "Shutdown canceled: ",
+    "canceled_title": "Shutdown canceled",
+    "canceled_message": "Scheduled shutdown has been canceled.",
+    "error_title": "Error",
+    "notification_failed": "Error sending notification: {}",
+    "no_shutdown": "No shutdown scheduled.",
+    "cancel_failed": "Error cancelling shutdown!",
+    "interrupted": "Interrupted, no shutdown scheduled.",
+    "start_failed": "Error starting command: {}",
+    "run_failed": "Command failed with exit status {}, no shutdown scheduled.",
+    # Templates
+    "one_hour": "one hour",
+    "hours": "{} hours",
+    "one_minute": "one minute",
+    "minutes": "{} minutes",
+    "one_second": "one second",
+    "seconds": "{} seconds",
+    "and": "and",
+    "today": "%H:%M",
+    "tomorrow": "tomorrow at %H:%M",
+    "later": "%m/%d/%Y at %H:%M",
+    "preview": "→ {}",
+    "scheduled_in": "✅ Shutdown scheduled in {}.",
+    "scheduled_at": "✅ Shutdown scheduled for {}.",
+    "scheduled_for": "Shutdown scheduled for {} (in {}).",
+    "waiting_for": "Waiting for {}...",
+    "one_process": "1 process",
+    "processes": "{} processes",
+    "network": "network",
+    "disks": "disks",
+    "trigger_processes": "{} to exit",
+    "trigger_network": "{interface} to stay below {rate} KB/s for {hold} min",
+    "trigger_disk": "{devices} to stay below {rate} MB/s for {hold} min",
+    "trigger_idle": "{idle} min without user activity",
+    "trigger_directory": "{path} to stay unchanged for {hold} min",
+}
+
+TEXTS = {
+    "en_US": ENGLISH,
+    "en_EU": {
+        **ENGLISH,
+        "canceled": "❌ Shutdown cancelled!",
+        "canceled_prefix": "Shutdown cancelled: ",
+        "canceled_title": "Shutdown cancelled",
+        "canceled_message": "Scheduled shutdown has been cancelled.",
+        "later": "%d.%m.%Y at %H:%M",
+    },
+    "de": {
+        "invalid_input": "❌ Ungültige Eingabe!",
+        "invalid_time": "Ungültige Uhrzeit! Format: HH:MM, HH:MM morgen oder JJJJ-MM-TT HH:MM",
+        "invalid_duration": "Ungültiges Format! Verwende Minuten (z.B. 90), Stunden:Minuten (z.B. 1:30) oder Einheiten (z.B. 1h30m, 45s).",
+        "invalid_trigger": "Ungültiger Auslöser! Verwende PIDs, Prozessnamen (z.B. wget), net [IFACE] [KB/s] [min], disk [GERÄT] [MB/s] [min] [sync], dir PFAD [min] oder idle [min].",
+        "trigger_failed": "❌ Auslöser fehlgeschlagen!",
+        "trigger_failed_message": "Benutzeraktivität kann nicht überwacht werden: {}",
+        "waiting": "⏳ Warte auf {}.",
+        "rate_done": " · fertig ≈ {:%H:%M}",
+        "command_failed": "⚠️ Fehler beim Shutdown-Befehl!",
+        "command_failed_message": "Fehler beim Shutdown-Befehl!",
+        "scheduled_title": "Shutdown geplant",
+        "postponed": "System ausgelastet, Shutdown verschoben auf {:%H:%M}.",
+        "postponed_title": "Shutdown verschoben",
+        "canceled": "❌ Shutdown abgebrochen!",
+        "canceled_prefix": "Shutdown abgebrochen: ",
+        "canceled_title": "Shutdown abgebrochen",
+        "canceled_message": "Der geplante Shutdown wurde abgebrochen.",
+        "error_title": "Fehler",
+        "notification_failed": "Fehler beim Senden der Notification: {}",
+        "no_shutdown": "Kein Shutdown geplant.",
+        "cancel_failed": "Fehler beim Abbrechen des Shutdowns!",
+        "interrupted": "Unterbrochen, kein Shutdown geplant.",
+        "start_failed": "Fehler beim Starten des Befehls: {}",
+        "run_failed": "Befehl mit Status {} fehlgeschlagen, kein Shutdown geplant.",
+        # Templates
+        "one_hour": "einer Stunde",
+        "hours": "{} Stunden",
+        "one_minute": "einer Minute",
+        "minutes": "{} Minuten",
+        "one_second": "einer Sekunde",
+        "seconds": "{} Sekunden",
+        "and": "und",
+        "today": "um %H:%M Uhr",
+        "tomorrow": "morgen um %H:%M Uhr",
+        "later": "am %d.%m.%Y um %H:%M Uhr",
+        "preview": "→ {}",
+        "scheduled_in": "✅ Shutdown in {} geplant.",
+        "scheduled_at": "✅ Shutdown erfolgt {}.",
+        "scheduled_for": "Shutdown erfolgt {} (in {}).",
+        "waiting_for": "Warte auf {}...",
+        "one_process": "1 Prozess",
+        "processes": "{} Prozesse",
+        "network": "Netzwerk",
+        "disks": "Datenträger",
+        "trigger_processes": "{}",
+        "trigger_network": "{interface} unter {rate} KB/s für {hold} min",
+        "trigger_disk": "{devices} unter {rate} MB/s für {hold} min",
+        "trigger_idle": "{idle} min ohne Benutzeraktivität",
+        "trigger_directory": "Ruhe in {path} für {hold} min",
+    },
+}
+
+
+def locale_language(environ):
+    # The first of LC_ALL, LC_MESSAGES and LANG that is set, as gettext
+    # picks it; anything but German or non-US English reads as en_US
+    value = environ.get("LC_ALL") or environ.get("LC_MESSAGES") or environ.get("LANG") or ""
+    if value.startswith("de"):
+        return "de"
+    if re.match(r"en_(?!US)", value):
+        return "en_EU"
+    return "en_US"
+
+
+def count(number, one, many):
+    return one if number == 1 else many.format(number)
+
+
+def format_duration(seconds, language, wrap=False):
+    # wrap puts the second part on its own line, for the status label
+    texts = TEXTS[language]
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    parts = []
+    if hours:
+        parts.append(count(hours, texts["one_hour"], texts["hours"]))
+    if minutes:
+        parts.append(count(minutes, texts["one_minute"], texts["minutes"]))
+    # Seconds count below an hour: 90s is not "one minute"
+    if seconds and not hours or not parts:
+        parts.append(count(seconds, texts["one_second"], texts["seconds"]))
+    return ("\n" if wrap else " ").join([parts[0]] + [f"{texts['and']} {part}" for part in parts[1:]])
+
+
+def format_deadline(deadline, now, language):
+    texts = TEXTS[language]
+    delta_days = (deadline.date() - now.date()).days
+    if delta_days == 1:
+        return deadline.strftime(texts["tomorrow"])
+    if delta_days > 1:
+        return deadline.strftime(texts["later"])
+    return deadline.strftime(texts["today"])
+
+
+def format_preview(deadline, now, language):
+    # Preview only, nothing is scheduled yet
+    return TEXTS[language]["preview"].format(format_deadline(deadline, now, language))
+
+
+def format_time_string(seconds, language):
+    return TEXTS[language]["scheduled_in"].format(format_duration(seconds, language, True))
+
+
+def format_datetime_string(deadline, now, language):
+    # Anything later than today goes on its own line
+    text = format_deadline(deadline, now, language)
+    if deadline.date() != now.date():
+        text = "\n" + text
+    return TEXTS[language]["scheduled_at"].format(text)
+
+
+def format_scheduled(deadline, now, language):
+    # One line for the command line, without the emoji
+    return TEXTS[language]["scheduled_for"].format(
+        format_deadline(deadline, now, language), format_duration(max(0, (deadline - now).total_seconds()), language)
+    )
+
+
+def format_process_count(number, language):
+    texts = TEXTS[language]
+    return count(number, texts["one_process"], texts["processes"])
+
+
+def describe_trigger(trigger, language):
+    texts = TEXTS[language]
+    if trigger[0] == "network":
+        _, interface, rate, hold = trigger
+        return texts["trigger_network"].format(interface=interface or texts["network"], rate=rate // 1000, hold=hold // 60)
+    if trigger[0] == "disk":
+        _, devices, rate, hold, _ = trigger
+        return texts["trigger_disk"].format(devices=", ".join(devices) or texts["disks"], rate=rate // 1000000, hold=hold // 60)
+    if trigger[0] == "idle":
+        return texts["trigger_idle"].format(idle=trigger[1] // 60)
+    if trigger[0] == "directory":
+        return texts["trigger_directory"].format(path=trigger[1], hold=trigger[2] // 60)
+    return texts["trigger_processes"].format(format_process_count(len(trigger[1]), language))
+
+
+def format_rate(rate):
+    if rate >= 1000000:
+        return f"{rate / 1000000:.1f} MB/s"
+    return f"{rate / 1000:.0f} KB/s"
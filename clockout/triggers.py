@@ -0,0 +1,380 @@
+# Shutdown triggers for the GTK front ends, watched from the GLib main loop
+import os
+import time
+
+from gi.repository import GLib, Gio
+
+from clockout import inotify, pressure, processes, rates, session
+
+# Seconds between checks where pidfds are not available
+PROCESS_POLL_SECONDS = 5
+
+# logind session idle state and the screensaver signals
+LOGIND_NAME = "org.freedesktop.login1"
+LOGIND_PATH = "/org/freedesktop/login1"
+LOGIND_INTERFACE = "org.freedesktop.login1.Manager"
+SESSION_INTERFACE = "org.freedesktop.login1.Session"
+PROPERTIES_INTERFACE = "org.freedesktop.DBus.Properties"
+SCREENSAVER_INTERFACES = ("org.freedesktop.ScreenSaver", "org.gnome.ScreenSaver")
+# Milliseconds to wait for each logind reply while arming
+LOGIND_TIMEOUT = 5000
+
+
+class ProcessWatch:
+    # Calls on_exit once all given processes have exited. Each pidfd is a
+    # main loop source of its own, so waiting costs nothing.
+    def __init__(self, pids, on_exit):
+        self.on_exit = on_exit
+        self.sources = {}
+        self.polled = []
+        self.poll_id = None
+        self.fire_id = None
+        for pid in pids:
+            try:
+                fd = processes.open_pidfd(pid)
+            except (AttributeError, OSError):
+                self.polled.append(pid)
+                continue
+            if fd is not None:
+                self.sources[fd] = GLib.unix_fd_add_full(
+                    GLib.PRIORITY_DEFAULT, fd, GLib.IOCondition.IN, self.on_process_exited
+                )
+        if self.polled:
+            self.poll_id = GLib.timeout_add_seconds(PROCESS_POLL_SECONDS, self.on_poll)
+        self.check_done()
+
+    def on_process_exited(self, fd, condition):
+        GLib.source_remove(self.sources.pop(fd))
+        os.close(fd)
+        self.check_done()
+        return False
+
+    def on_poll(self):
+        self.polled = [pid for pid in self.polled if processes.process_alive(pid)]
+        if self.polled:
+            return True
+        self.poll_id = None
+        self.check_done()
+        return False
+
+    def check_done(self):
+        if not self.sources and not self.polled:
+            self.fire_id = GLib.idle_add(self.fire)
+
+    def fire(self):
+        self.fire_id = None
+        self.on_exit()
+        return False
+
+    def stop(self):
+        for fd, source_id in self.sources.items():
+            GLib.source_remove(source_id)
+            os.close(fd)
+        self.sources.clear()
+        if self.poll_id:
+            GLib.source_remove(self.poll_id)
+            self.poll_id = None
+        self.polled = []
+        if self.fire_id:
+            GLib.source_remove(self.fire_id)
+            self.fire_id = None
+
+
+class IdleWatch:
+    # Samples a rates.RateIdle every interval seconds and calls on_idle once
+    # it fired; on_sample gets the RateIdle after every sample
+    def __init__(self, idle, interval, on_idle, on_sample=None):
+        self.idle = idle
+        self.on_idle = on_idle
+        self.on_sample = on_sample
+        self.idle.sample()
+        self.timeout_id = GLib.timeout_add_seconds(interval, self.on_timeout)
+
+    def on_timeout(self):
+        fired = self.idle.sample()
+        self.sampled()
+        if not fired:
+            return True
+        self.timeout_id = None
+        self.idle.close()
+        self.on_idle()
+        return False
+
+    def sampled(self):
+        if self.on_sample:
+            self.on_sample(self.idle)
+
+    def stop(self):
+        if self.timeout_id:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+        self.idle.close()
+
+
+class NetworkIdleWatch(IdleWatch):
+    # Calls on_idle once the interface has stayed under the rate long enough
+    def __init__(self, interface, threshold, hold, on_idle, on_sample=None):
+        idle = rates.NetworkIdle(interface, threshold, hold)
+        super().__init__(idle, rates.NETWORK_SAMPLE_SECONDS, on_idle, on_sample)
+
+
+class DiskIdleWatch(IdleWatch):
+    # Calls on_idle once the disks are quiet and written back; with sync,
+    # writeback is started as soon as the copying itself has stopped, so
+    # the shutdown does not have to wait for it
+    def __init__(self, devices, threshold, hold, sync, on_idle, on_sample=None):
+        self.sync = sync
+        self.sync_process = None
+        idle = rates.DiskIdle(devices, threshold, hold)
+        super().__init__(idle, rates.DISK_SAMPLE_SECONDS, on_idle, on_sample)
+
+    def sampled(self):
+        if self.sync and self.idle.sync_due and not self.sync_process:
+            try:
+                self.sync_process = Gio.Subprocess.new(["sync"], Gio.SubprocessFlags.NONE)
+            except GLib.Error:
+                self.sync = False
+            else:
+                self.sync_process.wait_async(None, self.on_synced)
+        super().sampled()
+
+    def on_synced(self, process, result):
+        process.wait_finish(result)
+        self.sync_process = None
+
+
+class DirectoryQuietWatch:
+    # Calls on_quiet once nothing below path has changed for hold seconds.
+    # Events only move the last change; the timer is re-armed when it runs
+    # out, not on every write.
+    def __init__(self, path, hold, on_quiet):
+        self.quiet = inotify.DirectoryQuiet(path, hold)
+        self.on_quiet = on_quiet
+        self.source_id = GLib.unix_fd_add_full(
+            GLib.PRIORITY_DEFAULT, self.quiet.fd, GLib.IOCondition.IN, self.on_events
+        )
+        self.timeout_id = None
+        self.arm(hold)
+
+    def arm(self, seconds):
+        self.timeout_id = GLib.timeout_add(max(1, int(seconds * 1000)), self.on_timeout)
+
+    def on_events(self, fd, condition):
+        self.quiet.read_events()
+        return True
+
+    def on_timeout(self):
+        self.timeout_id = None
+        # Pick up what is queued but not dispatched yet
+        self.quiet.read_events()
+        remaining = self.quiet.remaining()
+        if remaining > 0:
+            self.arm(remaining)
+            return False
+        self.stop()
+        self.on_quiet()
+        return False
+
+    def stop(self):
+        if self.source_id:
+            GLib.source_remove(self.source_id)
+            self.source_id = None
+        if self.timeout_id:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+        self.quiet.close()
+
+
+class UserIdleWatch:
+    # Calls on_idle once the session has been idle for hold seconds. Idle
+    # state comes from logind's IdleHint property changes and the
+    # screensaver's ActiveChanged signal; the only timer is the one until
+    # the hold would be over.
+    def __init__(self, hold, on_idle, on_error=None):
+        self.idle = session.UserIdle(hold)
+        self.on_idle = on_idle
+        self.on_error = on_error
+        self.timeout_id = None
+        self.subscriptions = []
+        # Set up without blocking the main loop, logind may be slow to
+        # answer; errors go to on_error(message) instead of being raised
+        self.cancellable = Gio.Cancellable()
+        Gio.bus_get(Gio.BusType.SYSTEM, self.cancellable, self.on_system_bus)
+
+    def on_system_bus(self, source, result):
+        try:
+            system = Gio.bus_get_finish(result)
+        except GLib.Error as e:
+            self.fail(e)
+            return
+        self.call(system, LOGIND_PATH, LOGIND_INTERFACE, "GetSession",
+                  GLib.Variant("(s)", ("auto",)), "(o)", self.on_session_path)
+
+    def on_session_path(self, system, reply):
+        path = reply[0]
+        self.subscribe(system, LOGIND_NAME, PROPERTIES_INTERFACE, "PropertiesChanged", path,
+                       self.on_session_changed)
+        self.call(system, path, PROPERTIES_INTERFACE, "GetAll",
+                  GLib.Variant("(s)", (SESSION_INTERFACE,)), "(a{sv})", self.on_session_state)
+
+    def on_session_state(self, system, reply):
+        self.update_session(reply[0])
+        Gio.bus_get(Gio.BusType.SESSION, self.cancellable, self.on_session_bus)
+
+    def on_session_bus(self, source, result):
+        try:
+            session_bus = Gio.bus_get_finish(result)
+        except GLib.Error:
+            # Not every desktop has a screensaver service, logind is enough
+            return
+        for interface in SCREENSAVER_INTERFACES:
+            self.subscribe(session_bus, None, interface, "ActiveChanged", None, self.on_screensaver_changed)
+
+    def call(self, bus, path, interface, method, parameters, reply_type, on_reply):
+        bus.call(
+            LOGIND_NAME, path, interface, method, parameters, GLib.VariantType(reply_type),
+            Gio.DBusCallFlags.NONE, LOGIND_TIMEOUT, self.cancellable, self.on_reply, on_reply
+        )
+
+    def on_reply(self, bus, result, on_reply):
+        try:
+            reply = bus.call_finish(result).unpack()
+        except GLib.Error as e:
+            self.fail(e)
+            return
+        on_reply(bus, reply)
+
+    def fail(self, error):
+        # A cancelled setup was stopped on purpose
+        if error.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+            return
+        self.stop()
+        if self.on_error:
+            self.on_error(error.message)
+
+    def subscribe(self, bus, sender, interface, member, path, callback):
+        subscription = bus.signal_subscribe(
+            sender, interface, member, path, None, Gio.DBusSignalFlags.NONE, callback
+        )
+        self.subscriptions.append((bus, subscription))
+
+    def on_session_changed(self, bus, sender, path, interface, signal, parameters):
+        changed_interface, changed, _ = parameters.unpack()
+        if changed_interface == SESSION_INTERFACE and "IdleHint" in changed:
+            self.update_session(changed)
+
+    def update_session(self, properties):
+        # IdleSinceHintMonotonic is CLOCK_MONOTONIC in microseconds, the
+        # clock behind time.monotonic(); 0 if logind doesn't know
+        since = properties.get("IdleSinceHintMonotonic") or None
+        self.idle.update("logind", properties.get("IdleHint", False), since and since / 1000000)
+        self.arm()
+
+    def on_screensaver_changed(self, bus, sender, path, interface, signal, parameters):
+        self.idle.update(interface, parameters.unpack()[0])
+        self.arm()
+
+    def arm(self):
+        if self.timeout_id:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+        remaining = self.idle.remaining()
+        if remaining is not None:
+            self.timeout_id = GLib.timeout_add(max(1, int(remaining * 1000)), self.on_timeout)
+
+    def on_timeout(self):
+        self.timeout_id = None
+        if self.idle.remaining() == 0:
+            self.stop()
+            self.on_idle()
+        else:
+            self.arm()
+        return False
+
+    def stop(self):
+        self.cancellable.cancel()
+        if self.timeout_id:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+        for bus, subscription in self.subscriptions:
+            bus.signal_unsubscribe(subscription)
+        self.subscriptions = []
+
+
+class PressureGuard:
+    # Postpones a due shutdown in steps while the system is still saturated.
+    # PSI triggers only record when pressure was last reported; the decision
+    # is made once, shortly before the deadline.
+    def __init__(self, on_postpone, step, maximum, percent):
+        self.on_postpone = on_postpone
+        self.step = step
+        self.maximum = maximum
+        self.percent = percent
+        self.sources = {}
+        self.timeout_id = None
+        self.last_pressure = None
+        self.postponed = 0
+
+    def start(self, timestamp):
+        # Guard the shutdown at timestamp; False without PSI triggers
+        self.stop()
+        for fd in pressure.open_pressure_triggers(self.percent):
+            self.sources[fd] = GLib.unix_fd_add_full(
+                GLib.PRIORITY_DEFAULT, fd, GLib.IOCondition.PRI | GLib.IOCondition.ERR, self.on_pressure
+            )
+        self.arm(timestamp)
+        return bool(self.sources)
+
+    def arm(self, timestamp):
+        # (Re)arm the decision for a deadline that moved
+        if not self.sources:
+            return
+        if self.timeout_id:
+            GLib.source_remove(self.timeout_id)
+        delay = timestamp - time.time() - pressure.POSTPONE_LEAD_SECONDS
+        self.timeout_id = GLib.timeout_add_seconds(max(0, int(delay)), self.on_check)
+
+    def on_pressure(self, fd, condition):
+        if condition & GLib.IOCondition.ERR:
+            # The pressure file went away
+            del self.sources[fd]
+            os.close(fd)
+            return False
+        self.last_pressure = time.monotonic()
+        return True
+
+    def busy(self):
+        return (self.last_pressure is not None
+                and time.monotonic() - self.last_pressure < pressure.PRESSURE_RECENT_SECONDS)
+
+    def on_check(self):
+        self.timeout_id = None
+        if self.busy() and self.postponed + self.step <= self.maximum:
+            self.postponed += self.step
+            self.on_postpone(self.step)
+        return False
+
+    def stop(self):
+        if self.timeout_id:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+        for fd, source_id in self.sources.items():
+            GLib.source_remove(source_id)
+            os.close(fd)
+        self.sources.clear()
+        self.last_pressure = None
+        self.postponed = 0
+
+
+def start_watch(trigger, on_fired, on_sample=None, on_error=None):
+    # The watch for a parsing.parse_trigger() result; all of them have stop().
+    # Only the idle watch can fail after it started, through on_error
+    if trigger[0] == "network":
+        return NetworkIdleWatch(*trigger[1:], on_fired, on_sample)
+    if trigger[0] == "disk":
+        return DiskIdleWatch(*trigger[1:], on_fired, on_sample)
+    if trigger[0] == "idle":
+        return UserIdleWatch(trigger[1], on_fired, on_error)
+    if trigger[0] == "directory":
+        return DirectoryQuietWatch(*trigger[1:], on_fired)
+    return ProcessWatch(trigger[1], on_fired)
@@ -1,48 +1,66 @@
 #!/usr/bin/env python3
+import sys
+
+from clockout import profile
+
+# Opt-in launch timing, started before anything heavy is imported
+startup_profile = profile.StartupProfile.from_arguments(sys.argv)
+
 import gi
-import subprocess
 import os
-from datetime import datetime, timedelta
+startup_profile.mark("imports")
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, GdkPixbuf, GLib
+startup_profile.mark("require_version")
+from gi.repository import Gtk, Gdk, GLib, Gio
+startup_profile.mark("import_gtk")
 
-class ShutdownApp(Gtk.Window):
+from clockout import assets, controller, pressure
+startup_profile.mark("import_backend")
+
+# One running instance for every ClockOut variant
+APPLICATION_ID = "org.clockout.ClockOut"
+
+# Texts for the shared controller, see clockout.texts
+LANGUAGE = "en_EU"
+
+class ClockOutApplication(Gtk.Application):
     def __init__(self):
-        super().__init__(title="ClockOut")
+        super().__init__(application_id=APPLICATION_ID, flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
+        self.window = None
+
+    def do_command_line(self, command_line):
+        startup_profile.mark("command_line")
+        # Later launches forward their arguments here over D-Bus and exit
+        if self.window is None:
+            self.window = ShutdownApp(self)
+        self.window.handle_arguments(command_line.get_arguments()[1:])
+        self.window.present()
+        return 0
+
+class ShutdownApp(Gtk.Window):
+    def __init__(self, application):
+        super().__init__(title="ClockOut", application=application)
+        startup_profile.mark("window")
         self.set_border_width(10)
         self.set_default_size(300, 200)
-        self.shutdown_scheduled = False
-        self.progress_timeout_id = None
-        self.total_seconds = 0
-        self.start_time = None
+        self.about_dialog = None
         self.icon_right_margin = 45  # Right margin parameter
 
-        # Get paths
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        image_path = os.path.join(script_dir, "clockoutbg.png")
-        enter_path = os.path.join(script_dir, "enter.png")
-
-        # Load background
-        pixbuf = GdkPixbuf.Pixbuf.new_from_file(image_path)
-        scaled_pixbuf = pixbuf.scale_simple(
-            pixbuf.get_width() // 1.5, pixbuf.get_height() // 1.5, GdkPixbuf.InterpType.BILINEAR
-        )
-        self.background = Gtk.Image.new_from_pixbuf(scaled_pixbuf)
-
-        # Load and scale enter icon
-        enter_pixbuf = GdkPixbuf.Pixbuf.new_from_file(enter_path)
-        scaled_enter = enter_pixbuf.scale_simple(
-            enter_pixbuf.get_width() // 2,
-            enter_pixbuf.get_height() // 2,
-            GdkPixbuf.InterpType.BILINEAR
-        )
+        # Get assets
+        self.assets = assets.Assets(os.path.dirname(os.path.abspath(__file__)), startup_profile)
+        startup_profile.mark("load_resources")
 
         # Theme-based color inversion
         style_context = self.get_style_context()
         success, bg_color = style_context.lookup_color('theme_bg_color')
-        if success and (0.2126 * bg_color.red + 0.7152 * bg_color.green + 0.0722 * bg_color.blue) <= 0.5:
-            scaled_enter = self.invert_pixbuf(scaled_enter)
+        invert_icons = success and (0.2126 * bg_color.red + 0.7152 * bg_color.green + 0.0722 * bg_color.blue) <= 0.5
+
+        # Load background
+        self.background = Gtk.Image.new_from_pixbuf(self.assets.load_scaled_pixbuf("clockoutbg.png", 1.5))
+
+        # Load and scale enter icon
+        scaled_enter = self.assets.load_scaled_pixbuf("enter.png", 2, invert_icons)
 
         enter_icon = Gtk.Image.new_from_pixbuf(scaled_enter)
         enter_icon.set_margin_end(self.icon_right_margin)
@@ -50,6 +68,7 @@ class ShutdownApp(Gtk.Window):
         # EventBox for transparency
         self.event_box = Gtk.EventBox()
         self.event_box.add(self.background)
+        startup_profile.mark("images")
         
         # Theme brightness
         self.event_box.set_opacity(0.06 if success and (0.2126 * bg_color.red + 0.7152 * bg_color.green + 0.0722 * bg_color.blue) > 0.5 else 0.11)
@@ -66,6 +85,10 @@ class ShutdownApp(Gtk.Window):
         self.progress.get_style_context().add_class("gtk-progress-bar")
         self.progress.set_no_show_all(True)
 
+        # Live transfer rate while a network trigger waits
+        self.label_rate = Gtk.Label()
+        self.label_rate.set_no_show_all(True)
+
         # UI elements
         self.overlay = Gtk.Overlay()
         self.add(self.overlay)
@@ -77,9 +100,21 @@ class ShutdownApp(Gtk.Window):
         self.radio_time.set_can_focus(False)
         self.radio_duration = Gtk.RadioButton.new_with_label_from_widget(self.radio_time, "Set duration")
         self.radio_duration.set_can_focus(False)
+        self.radio_trigger = Gtk.RadioButton.new_with_label_from_widget(self.radio_time, "Set trigger")
+        self.radio_trigger.set_can_focus(False)
         
-        self.entry_time = Gtk.Entry(placeholder_text="HH:MM (24-hour format)")
-        self.entry_duration = Gtk.Entry(placeholder_text="Minutes (MM) or Hours (HH:MM)")
+        self.entry_time = Gtk.Entry(placeholder_text="HH:MM, HH:MM tomorrow, YYYY-MM-DD HH:MM")
+        self.entry_duration = Gtk.Entry(placeholder_text="Minutes (MM), HH:MM or 1h30m / 45s")
+        self.entry_trigger = Gtk.Entry(placeholder_text="wget, net 50 KB/s, dir ~/Downloads or idle 15 min")
+
+        # Keep the shutdown when the app is closed
+        self.check_keep = Gtk.CheckButton(label="Keep after closing")
+        self.check_keep.set_can_focus(False)
+
+        # Push the shutdown back while the system is still busy (PSI)
+        self.check_postpone = Gtk.CheckButton(label="Postpone while busy")
+        self.check_postpone.set_can_focus(False)
+        self.check_postpone.set_sensitive(pressure.pressure_supported())
         
         # Button with adjusted spacing
         button_box = Gtk.Box(spacing=10)
@@ -99,28 +134,66 @@ class ShutdownApp(Gtk.Window):
         self.about_button.set_valign(Gtk.Align.END)
 
         # Assemble UI
-        for widget in [self.radio_time, self.radio_duration, self.entry_time, 
-                      self.entry_duration, self.button_schedule, self.label_status]:
+        for widget in [self.radio_time, self.radio_duration, self.radio_trigger, self.entry_time,
+                      self.entry_duration, self.entry_trigger, self.check_keep, self.check_postpone, self.button_schedule, self.label_status]:
             self.vbox.pack_start(widget, False, False, 0)
         
         self.vbox.pack_start(self.progress, False, False, 5)
+        self.vbox.pack_start(self.label_rate, False, False, 0)
         self.vbox.pack_end(self.about_button, False, False, 5)
 
+        # Scheduling state, shared with the other ClockOut windows
+        self.controller = controller.ShutdownController(
+            LANGUAGE, self.label_status, self.check_keep, self.progress, self.label_rate, self.check_postpone
+        )
+
         # Signal connections
         self.radio_time.connect("toggled", self.toggle_input_fields)
+        self.radio_time.connect("toggled", self.on_entry_changed)
+        self.radio_trigger.connect("toggled", self.toggle_input_fields)
+        self.radio_trigger.connect("toggled", self.on_entry_changed)
         self.entry_time.connect("activate", self.schedule_shutdown)
         self.entry_duration.connect("activate", self.schedule_shutdown)
+        self.entry_time.connect("changed", self.on_entry_changed)
+        self.entry_duration.connect("changed", self.on_entry_changed)
+        self.entry_trigger.connect("activate", self.schedule_shutdown)
+        self.entry_trigger.connect("changed", self.on_entry_changed)
         self.button_schedule.connect("clicked", self.schedule_shutdown)
         self.connect("destroy", self.on_destroy)
+        self.connect("map-event", lambda widget, event: self.controller.set_countdown_visible(True))
+        self.connect("unmap-event", lambda widget, event: self.controller.set_countdown_visible(False))
+        self.connect("window-state-event", self.on_window_state_event)
+        startup_profile.mark("widgets")
 
         # Initialization
         self.entry_duration.set_visible(False)
+        self.entry_trigger.set_visible(False)
         self.radio_time.set_active(True)
         GLib.idle_add(self.toggle_input_fields)
         self.show_all()
         self.progress.hide()
+        startup_profile.mark("show_all")
+
+        # The startup profile ends with the first painted frame
+        if startup_profile.enabled:
+            self.get_frame_clock().connect("after-paint", self.on_first_frame)
+
+        # Clock watch and a shutdown still pending from an earlier run
+        self.controller.start()
+        startup_profile.mark("restore")
+
+    def on_first_frame(self, frame_clock):
+        startup_profile.mark("first_frame")
+        startup_profile.write()
+        frame_clock.disconnect_by_func(self.on_first_frame)
 
     def show_about_dialog(self, widget):
+        # Built on first use, hidden instead of destroyed on close
+        if self.about_dialog is None:
+            self.about_dialog = self.build_about_dialog()
+        self.about_dialog.present()
+
+    def build_about_dialog(self):
         about_dialog = Gtk.Dialog(
             title="About ClockOut",
             parent=self,
@@ -132,15 +205,11 @@ class ShutdownApp(Gtk.Window):
         content.set_border_width(20)
         
         # loading and scaling logo
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        logo_path = os.path.join(script_dir, "clockout.png")
-        if os.path.exists(logo_path):
-            logo_pixbuf = GdkPixbuf.Pixbuf.new_from_file(logo_path)
-            scaled_logo = logo_pixbuf.scale_simple(
-                int(logo_pixbuf.get_width() * 0.1),
-                int(logo_pixbuf.get_height() * 0.1),
-                GdkPixbuf.InterpType.BILINEAR
-            )
+        try:
+            scaled_logo = self.assets.decode_scaled_asset("clockout.png", 10)
+        except (GLib.Error, OSError):
+            scaled_logo = None
+        if scaled_logo:
             logo_image = Gtk.Image.new_from_pixbuf(scaled_logo)
             logo_box = Gtk.Box()
             logo_box.set_halign(Gtk.Align.CENTER)
@@ -168,174 +237,56 @@ class ShutdownApp(Gtk.Window):
 
         # Dialog-Buttons
         close_button = Gtk.Button.new_with_label("Close")
-        close_button.connect("clicked", lambda x: about_dialog.destroy())
+        close_button.connect("clicked", lambda x: about_dialog.hide())
+        about_dialog.connect("delete-event", lambda dialog, event: dialog.hide_on_delete())
         about_dialog.get_content_area().add(content)
         about_dialog.get_content_area().pack_end(close_button, False, False, 10)
         
-        about_dialog.show_all()
-
-    def invert_pixbuf(self, pixbuf):
-        # Convert pixbuf to mutable byte array
-        pixels = bytearray(pixbuf.get_pixels())
-        n_channels = pixbuf.get_n_channels()
-        rowstride = pixbuf.get_rowstride()
-
-        # Invert colors
-        for y in range(pixbuf.get_height()):
-            for x in range(pixbuf.get_width()):
-                offset = y * rowstride + x * n_channels
-                if offset + 2 < len(pixels):
-                    pixels[offset] = 255 - pixels[offset]     # Red
-                    pixels[offset+1] = 255 - pixels[offset+1] # Green
-                    pixels[offset+2] = 255 - pixels[offset+2] # Blue
-
-        # Create new pixbuf from modified data
-        return GdkPixbuf.Pixbuf.new_from_bytes(
-            GLib.Bytes.new(pixels),
-            pixbuf.get_colorspace(),
-            pixbuf.get_has_alpha(),
-            pixbuf.get_bits_per_sample(),
-            pixbuf.get_width(),
-            pixbuf.get_height(),
-            rowstride
-        )
+        about_dialog.get_content_area().show_all()
+        return about_dialog
+
+    def handle_arguments(self, args):
+        # "at 23:15 tomorrow", "in 1h30m" etc., like the command line tool
+        if len(args) < 2 or args[0] not in ("at", "in", "after"):
+            return
+        if args[0] == "at":
+            self.radio_time.set_active(True)
+            self.entry_time.set_text(" ".join(args[1:]))
+        elif args[0] == "in":
+            self.radio_duration.set_active(True)
+            self.entry_duration.set_text(" ".join(args[1:]))
+        else:
+            self.radio_trigger.set_active(True)
+            self.entry_trigger.set_text(" ".join(args[1:]))
+        self.schedule_shutdown(None)
 
     def toggle_input_fields(self, widget=None):
-        if self.radio_time.get_active():
-            self.entry_time.show()
-            self.entry_duration.hide()
-        else:
-            self.entry_time.hide()
-            self.entry_duration.show()
+        startup_profile.mark("toggle_input_fields")
+        self.entry_time.set_visible(self.radio_time.get_active())
+        self.entry_duration.set_visible(self.radio_duration.get_active())
+        self.entry_trigger.set_visible(self.radio_trigger.get_active())
 
-    def schedule_shutdown(self, widget):
+    def current_input(self):
+        # (mode, text) as the controller takes them
         if self.radio_time.get_active():
-            self.schedule_by_time()
-        else:
-            self.schedule_by_duration()
+            return "time", self.entry_time.get_text()
+        if self.radio_duration.get_active():
+            return "duration", self.entry_duration.get_text()
+        return "trigger", self.entry_trigger.get_text()
 
-    def schedule_by_time(self):
-        try:
-            shutdown_time = datetime.strptime(self.entry_time.get_text(), "%H:%M").time()
-            now = datetime.now()
-            shutdown_datetime = datetime.combine(now.date(), shutdown_time)
-            
-            if shutdown_datetime < now:
-                shutdown_datetime += timedelta(days=1)
-            
-            self.total_seconds = int((shutdown_datetime - now).total_seconds())
-            self.start_progress(shutdown_datetime)
-            self.execute_shutdown(self.total_seconds, self.format_time_string(self.total_seconds))
-            
-        except ValueError:
-            self.show_error("❌ Invalid input!", "Invalid time! Format: HH:MM")
-
-    def schedule_by_duration(self):
-        try:
-            input_str = self.entry_duration.get_text()
-            if ":" in input_str:
-                hours, minutes = map(int, input_str.split(":", 1))
-                if hours < 0 or minutes < 0 or minutes >= 60:
-                    raise ValueError
-                total_minutes = hours * 60 + minutes
-            else:
-                total_minutes = int(input_str)
-            
-            if total_minutes <= 0:
-                raise ValueError
-            
-            self.total_seconds = total_minutes * 60
-            shutdown_datetime = datetime.now() + timedelta(seconds=self.total_seconds)
-            self.start_progress(shutdown_datetime)
-            self.execute_shutdown(self.total_seconds, self.format_datetime_string(shutdown_datetime))
-            
-        except ValueError:
-            self.show_error("❌ Invalid input!", 
-                           "Invalid format! Use minutes (e.g. 90) or minutes:hours (e.g. 1:30).")
-
-    def start_progress(self, end_time):
-        self.progress.set_fraction(1.0)
-        self.progress.show()
-        self.start_time = datetime.now()
-        
-        if self.progress_timeout_id:
-            GLib.source_remove(self.progress_timeout_id)
-        self.progress_timeout_id = GLib.timeout_add_seconds(1, self.update_progress, end_time)
-
-    def update_progress(self, end_time):
-        remaining = (end_time - datetime.now()).total_seconds()
-        if remaining <= 0:
-            self.progress.set_fraction(0.0)
-            self.progress.hide()
-            return False
-        
-        progress = 1 - (self.total_seconds - remaining) / self.total_seconds
-        self.progress.set_fraction(max(0.0, progress))
-        return True
-
-    def format_time_string(self, seconds):
-        minutes_total = seconds // 60
-        if minutes_total == 1:
-            return "✅ Shutdown scheduled in one minute."
-        if minutes_total == 60:
-            return "✅ Shutdown scheduled in one hour."
-        
-        if minutes_total > 60:
-            hours, mins = divmod(minutes_total, 60)
-            hours_str = "one hour" if hours == 1 else f"{hours} hours"
-            mins_str = "one minute" if mins == 1 else f"{mins} minutes" if mins > 0 else ""
-            return f"✅ Shutdown in {hours_str}\n{' and ' + mins_str if mins_str else ''}."
-        
-        return f"✅ Shutdown scheduled in {minutes_total} minutes."
+    def on_entry_changed(self, widget):
+        self.controller.preview_later(*self.current_input())
 
-    def format_datetime_string(self, dt):
-        now = datetime.now()
-        delta_days = (dt.date() - now.date()).days
-        
-        if delta_days == 1:
-            return f"✅ Shutdown scheduled for \ntomorrow at {dt.strftime('%H:%M')}."
-        elif delta_days > 1:
-            return f"✅ Shutdown scheduled for \n{dt.strftime('%d.%m.%Y at %H:%M')}."
-        else:
-            return f"✅ Shutdown scheduled for {dt.strftime('%H:%M')}."
+    def schedule_shutdown(self, widget):
+        self.controller.schedule(*self.current_input())
 
-    def execute_shutdown(self, delay_seconds, shutdown_str):
-        try:
-            subprocess.run(["shutdown", "-h", f"+{delay_seconds//60}"], check=True)
-            self.shutdown_scheduled = True
-            self.label_status.set_text(shutdown_str)
-            self.send_notification("Shutdown scheduled", shutdown_str.replace("✅ ", "").replace("\n", "").strip())
-        except subprocess.CalledProcessError:
-            self.show_error("⚠️ Error executing shutdown command!", "Error executing shutdown command!")
-
-    def show_error(self, text, notification_msg):
-        # Bestehenden Shutdown abbrechen
-        if self.shutdown_scheduled:
-            subprocess.run(["shutdown", "-c"], check=True)
-            self.shutdown_scheduled = False
-            text = "❌ Shutdown cancelled!\n" + "❌ " + text.split(" ", 1)[-1]
-            notification_msg = "Shutdown cancelled: " + notification_msg
-
-        self.label_status.set_text(text)
-        self.send_notification("Error", notification_msg)
-        self.progress.hide()
-        if self.progress_timeout_id:
-            GLib.source_remove(self.progress_timeout_id)
+    def on_window_state_event(self, widget, event):
+        if event.changed_mask & Gdk.WindowState.ICONIFIED:
+            self.controller.set_countdown_visible(not event.new_window_state & Gdk.WindowState.ICONIFIED)
+        return False
 
     def on_destroy(self, widget):
-        if self.shutdown_scheduled:
-            subprocess.run(["shutdown", "-c"], check=True)
-            self.send_notification("Shutdown cancelled", "Scheduled shutdown has been cancelled.")
-        if self.progress_timeout_id:
-            GLib.source_remove(self.progress_timeout_id)
-        Gtk.main_quit()
-
-    def send_notification(self, title, message):
-        try:
-            subprocess.run(["notify-send", title, message], check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Error sending notification: {e}")
+        self.controller.close()
 
-win = ShutdownApp()
-win.show_all()
-Gtk.main()
+app = ClockOutApplication()
+sys.exit(app.run(sys.argv))
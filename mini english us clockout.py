@@ -1,17 +1,48 @@
 #!/usr/bin/env python3
+import sys
+
+from clockout import profile
+
+# Opt-in launch timing, started before anything heavy is imported
+startup_profile = profile.StartupProfile.from_arguments(sys.argv)
+
 import gi
-import subprocess
-from datetime import datetime, timedelta
+startup_profile.mark("imports")
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, GLib, Pango
+startup_profile.mark("require_version")
+from gi.repository import Gtk, GLib, Pango, Gio
+startup_profile.mark("import_gtk")
 
-class ShutdownApp(Gtk.Window):
+from clockout import controller
+startup_profile.mark("import_backend")
+
+# One running instance for every ClockOut variant
+APPLICATION_ID = "org.clockout.ClockOut"
+
+# Texts for the shared controller, see clockout.texts
+LANGUAGE = "en_US"
+
+class ClockOutApplication(Gtk.Application):
     def __init__(self):
-        super().__init__(title="ClockOut")
+        super().__init__(application_id=APPLICATION_ID, flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
+        self.window = None
+
+    def do_command_line(self, command_line):
+        startup_profile.mark("command_line")
+        # Later launches forward their arguments here over D-Bus and exit
+        if self.window is None:
+            self.window = ShutdownApp(self)
+        self.window.handle_arguments(command_line.get_arguments()[1:])
+        self.window.present()
+        return 0
+
+class ShutdownApp(Gtk.Window):
+    def __init__(self, application):
+        super().__init__(title="ClockOut", application=application)
+        startup_profile.mark("window")
         self.set_border_width(10)
         self.set_default_size(300, 200)
-        self.shutdown_scheduled = False
 
         # Main layout
         vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
@@ -21,22 +52,41 @@ class ShutdownApp(Gtk.Window):
         self.radio_time = Gtk.RadioButton(label="Set time")
         self.radio_time.set_can_focus(False)
         self.radio_time.connect("toggled", self.toggle_input_fields)
+        self.radio_time.connect("toggled", self.on_entry_changed)
         self.radio_duration = Gtk.RadioButton.new_with_label_from_widget(self.radio_time, "Set duration")
         self.radio_duration.set_can_focus(False)
         vbox.pack_start(self.radio_time, False, False, 0)
         vbox.pack_start(self.radio_duration, False, False, 0)
+        self.radio_trigger = Gtk.RadioButton.new_with_label_from_widget(self.radio_time, "Set trigger")
+        self.radio_trigger.set_can_focus(False)
+        self.radio_trigger.connect("toggled", self.toggle_input_fields)
+        self.radio_trigger.connect("toggled", self.on_entry_changed)
+        vbox.pack_start(self.radio_trigger, False, False, 0)
 
         # Input fields
         self.entry_time = Gtk.Entry()
-        self.entry_time.set_placeholder_text("HH:MM (24-hour format)")
+        self.entry_time.set_placeholder_text("HH:MM or YYYY-MM-DD HH:MM")
         self.entry_time.connect("activate", self.schedule_shutdown)
+        self.entry_time.connect("changed", self.on_entry_changed)
         vbox.pack_start(self.entry_time, False, False, 0)
 
         self.entry_duration = Gtk.Entry()
-        self.entry_duration.set_placeholder_text("MM or HH:MM")
+        self.entry_duration.set_placeholder_text("MM, HH:MM or 1h30m")
         self.entry_duration.connect("activate", self.schedule_shutdown)
+        self.entry_duration.connect("changed", self.on_entry_changed)
         vbox.pack_start(self.entry_duration, False, False, 0)
 
+        self.entry_trigger = Gtk.Entry()
+        self.entry_trigger.set_placeholder_text("Process, net, disk, dir or idle")
+        self.entry_trigger.connect("activate", self.schedule_shutdown)
+        self.entry_trigger.connect("changed", self.on_entry_changed)
+        vbox.pack_start(self.entry_trigger, False, False, 0)
+
+        # Keep the shutdown when the app is closed
+        self.check_keep = Gtk.CheckButton(label="Keep after closing")
+        self.check_keep.set_can_focus(False)
+        vbox.pack_start(self.check_keep, False, False, 0)
+
         # Schedule button
         self.button_schedule = Gtk.Button(label="Schedule Shutdown")
         self.button_schedule.set_can_default(True)
@@ -57,144 +107,68 @@ class ShutdownApp(Gtk.Window):
         version_label.override_font(font_desc)
         vbox.pack_end(version_label, False, False, 0)
 
+        # Scheduling state, shared with the other ClockOut windows
+        self.controller = controller.ShutdownController(LANGUAGE, self.label_status, self.check_keep)
+        startup_profile.mark("widgets")
+
         self.connect("destroy", self.on_destroy)
         self.entry_duration.set_visible(False)
+        self.entry_trigger.set_visible(False)
         self.radio_time.set_active(True)
         GLib.idle_add(self.toggle_input_fields)
         self.show_all()
+        startup_profile.mark("show_all")
+
+        # The startup profile ends with the first painted frame
+        if startup_profile.enabled:
+            self.get_frame_clock().connect("after-paint", self.on_first_frame)
+
+        # Clock watch and a shutdown still pending from an earlier run
+        self.controller.start()
+        startup_profile.mark("restore")
+
+    def on_first_frame(self, frame_clock):
+        startup_profile.mark("first_frame")
+        startup_profile.write()
+        frame_clock.disconnect_by_func(self.on_first_frame)
+
+    def handle_arguments(self, args):
+        # "at 23:15 tomorrow", "in 1h30m" etc., like the command line tool
+        if len(args) < 2 or args[0] not in ("at", "in", "after"):
+            return
+        if args[0] == "at":
+            self.radio_time.set_active(True)
+            self.entry_time.set_text(" ".join(args[1:]))
+        elif args[0] == "in":
+            self.radio_duration.set_active(True)
+            self.entry_duration.set_text(" ".join(args[1:]))
+        else:
+            self.radio_trigger.set_active(True)
+            self.entry_trigger.set_text(" ".join(args[1:]))
+        self.schedule_shutdown(None)
 
     def toggle_input_fields(self, widget=None):
+        startup_profile.mark("toggle_input_fields")
+        self.entry_time.set_visible(self.radio_time.get_active())
+        self.entry_duration.set_visible(self.radio_duration.get_active())
+        self.entry_trigger.set_visible(self.radio_trigger.get_active())
+
+    def current_input(self):
+        # (mode, text) as the controller takes them
         if self.radio_time.get_active():
-            self.entry_time.set_visible(True)
-            self.entry_duration.set_visible(False)
-        else:
-            self.entry_time.set_visible(False)
-            self.entry_duration.set_visible(True)
+            return "time", self.entry_time.get_text()
+        if self.radio_duration.get_active():
+            return "duration", self.entry_duration.get_text()
+        return "trigger", self.entry_trigger.get_text()
+
+    def on_entry_changed(self, widget):
+        self.controller.preview_later(*self.current_input())
 
     def schedule_shutdown(self, widget):
-        if self.radio_time.get_active():
-            self.schedule_by_time()
-        else:
-            self.schedule_by_duration()
-
-    def schedule_by_time(self):
-        shutdown_time_str = self.entry_time.get_text()
-        try:
-            shutdown_time = datetime.strptime(shutdown_time_str, "%H:%M").time()
-            now = datetime.now()
-            shutdown_datetime = datetime.combine(now.date(), shutdown_time)
-
-            if shutdown_datetime < now:
-                shutdown_datetime += timedelta(days=1)
-
-            delay_seconds = int((shutdown_datetime - now).total_seconds())
-            hours, remainder = divmod(delay_seconds, 3600)
-            minutes = remainder // 60
-
-            # UI message for time input
-            hours_str = "one hour" if hours == 1 else f"{hours} hours" if hours > 0 else ""
-            minutes_str = "one minute" if minutes == 1 else f"{minutes} minutes" if minutes > 0 else ""
-            
-            if hours and minutes:
-                ui_message = f"✅ Shutdown in {hours_str} \nand {minutes_str}."
-            elif hours:
-                ui_message = f"✅ Shutdown in {hours_str}."
-            else:
-                ui_message = f"✅ Shutdown in {minutes_str}."
-
-            # Notification without emoji
-            notification_message = ui_message.replace("✅ ", "").replace("\n","")
-            self.execute_shutdown(delay_seconds, ui_message, notification_message)
-
-        except ValueError:
-            error_msg = "❌ Invalid input!"
-            notification_msg = "Invalid time! Format: HH:MM"
-            if self.shutdown_scheduled:
-                self.cancel_shutdown()
-                error_msg = "❌ Shutdown canceled!\n" + error_msg
-                notification_msg = "Shutdown canceled: " + notification_msg
-            self.label_status.set_text(error_msg)
-            self.send_notification("Error", notification_msg)
-
-    def schedule_by_duration(self):
-        input_str = self.entry_duration.get_text()
-        try:
-            if ":" in input_str:
-                parts = input_str.split(":")
-                if len(parts) != 2:
-                    raise ValueError
-                hours = int(parts[0])
-                minutes = int(parts[1])
-                if hours < 0 or minutes < 0 or minutes >= 60:
-                    raise ValueError
-                total_minutes = hours * 60 + minutes
-            else:
-                total_minutes = int(input_str)
-            
-            if total_minutes <= 0:
-                raise ValueError
-
-            shutdown_datetime = datetime.now() + timedelta(minutes=total_minutes)
-            now_date = datetime.now().date()
-            shutdown_date = shutdown_datetime.date()
-
-            # Date formatting
-            days_diff = (shutdown_date - now_date).days
-            if days_diff == 0:
-                time_str = shutdown_datetime.strftime("%H:%M")
-                date_str = "\nfor " + time_str
-            elif days_diff == 1:
-                time_str = shutdown_datetime.strftime("%H:%M")
-                date_str = "\nfor tomorrow " + time_str
-            else:
-                date_str = shutdown_datetime.strftime("for \n%m/%d/%Y at %H:%M")
-
-            # UI message with emoji
-            ui_message = f"✅ Shutdown scheduled {date_str}"
-            notification_message = ui_message.replace("✅ ", "").replace("\n", "")
-                        
-            self.execute_shutdown(total_minutes*60, ui_message, notification_message)
-
-        except ValueError:
-            error_msg = "❌ Invalid input!"
-            notification_msg = "Invalid input! Use minutes (e.g. 90) or hours:minutes (e.g. 1:30)."
-            if self.shutdown_scheduled:
-                self.cancel_shutdown()
-                error_msg = "❌ Shutdown canceled!\n" + error_msg
-                notification_msg = "Shutdown canceled: " + notification_msg
-            self.label_status.set_text(error_msg)
-            self.send_notification("Error", notification_msg)
-
-    def execute_shutdown(self, delay_seconds, ui_message, notification_message):
-        try:
-            subprocess.run(["shutdown", "-h", f"+{delay_seconds//60}"], check=True)
-            self.shutdown_scheduled = True
-            self.label_status.set_text(ui_message)
-            self.send_notification("Shutdown Scheduled", notification_message)
-        except subprocess.CalledProcessError:
-            self.shutdown_scheduled = False
-            self.label_status.set_text("⚠️ Shutdown command error!")
-            self.send_notification("Error", "Shutdown command failed!")
-
-    def cancel_shutdown(self):
-        try:
-            subprocess.run(["shutdown", "-c"], check=True)
-            self.shutdown_scheduled = False
-        except subprocess.CalledProcessError:
-            pass
+        self.controller.schedule(*self.current_input())
 
     def on_destroy(self, widget):
-        if self.shutdown_scheduled:
-            self.cancel_shutdown()
-            self.send_notification("Shutdown canceled", "Scheduled shutdown has been canceled.")
-        Gtk.main_quit()
-
-    def send_notification(self, title, message):
-        try:
-            subprocess.run(["notify-send", title, message], check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Notification error: {e}")
-
-win = ShutdownApp()
-win.show_all()
-Gtk.main()
+        self.controller.close()
+
+app = ClockOutApplication()
+sys.exit(app.run(sys.argv))
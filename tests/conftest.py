@@ -0,0 +1,36 @@
+# Shared fixtures; the tests import clockout straight from the checkout
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Stand-ins for the commands ClockOut runs, see fake_commands
+FAKEBIN = os.path.join(ROOT, "tests", "fakebin")
+
+
+@pytest.fixture
+def fake_commands(tmp_path, monkeypatch):
+    # Fake commands first on PATH, recording into tmp_path
+    monkeypatch.setenv("PATH", FAKEBIN + os.pathsep + os.environ.get("PATH", ""))
+    monkeypatch.setenv("CLOCKOUT_FAKE_STATE", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def run_until():
+    # Iterates the default GLib main context until condition() holds
+    from gi.repository import GLib
+
+    def run(condition, timeout=10):
+        context = GLib.MainContext.default()
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise AssertionError("timed out waiting for the main loop")
+            if not context.iteration(False):
+                time.sleep(0.005)
+    return run
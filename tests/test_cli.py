@@ -0,0 +1,143 @@
+# clockout.cli: cold start without GI, and at/in/status through main()
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from clockout import cli, schedule
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget for importing the CLI, in microseconds
+IMPORT_BUDGET_US = 50000
+
+
+def import_times(module):
+    # {module: cumulative microseconds} from python -X importtime
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys, {module}; print('gi' in sys.modules)"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return result.stdout.strip(), times
+
+
+def test_cli_imports_fast_without_gi():
+    gi_loaded, times = import_times("clockout.cli")
+    assert gi_loaded == "False"
+    assert "gi" not in times
+    assert times["clockout"] + times["clockout.cli"] < IMPORT_BUDGET_US
+
+
+@pytest.fixture(autouse=True)
+def english(monkeypatch):
+    # The messages follow the locale
+    monkeypatch.delenv("LC_ALL", raising=False)
+    monkeypatch.delenv("LC_MESSAGES", raising=False)
+    monkeypatch.setenv("LANG", "en_US.UTF-8")
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    # Deadlines handed to the backend instead of shutting anything down
+    deadlines = []
+    monkeypatch.setattr(cli, "schedule_shutdown", lambda deadline: deadlines.append(deadline) or True)
+    return deadlines
+
+
+def test_at(scheduled, capsys):
+    assert cli.main(["at", "2099-01-02", "23:15"]) == 0
+    assert scheduled == [datetime(2099, 1, 2, 23, 15)]
+    assert "01/02/2099 at 23:15" in capsys.readouterr().out
+
+
+def test_at_german(scheduled, capsys, monkeypatch):
+    monkeypatch.setenv("LANG", "de_DE.UTF-8")
+    assert cli.main(["at", "2099-01-02", "23:15"]) == 0
+    assert "Shutdown erfolgt am 02.01.2099 um 23:15 Uhr" in capsys.readouterr().out
+
+
+def test_at_tomorrow(scheduled):
+    assert cli.main(["at", "6:00", "tomorrow"]) == 0
+    tomorrow = datetime.now().date() + timedelta(days=1)
+    assert scheduled == [datetime.combine(tomorrow, datetime.min.time()).replace(hour=6)]
+
+
+def test_at_invalid(scheduled, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["at", "25:00"])
+    assert exit_info.value.code == 2
+    assert "invalid time" in capsys.readouterr().err
+    assert scheduled == []
+
+
+@pytest.mark.parametrize("duration, seconds", [
+    (["90"], 90 * 60),
+    (["1:30"], 90 * 60),
+    (["1h30m"], 90 * 60),
+    (["45s"], 45),
+    (["2h", "5m"], 125 * 60),
+])
+def test_in(scheduled, duration, seconds):
+    before = datetime.now()
+    assert cli.main(["in"] + duration) == 0
+    after = datetime.now()
+    deadline, = scheduled
+    assert before + timedelta(seconds=seconds) <= deadline <= after + timedelta(seconds=seconds)
+
+
+@pytest.mark.parametrize("duration, text", [
+    ("45s", "(in 45 seconds)"),
+    ("90s", "(in one minute and 30 seconds)"),
+    ("59m30s", "(in 59 minutes and 30 seconds)"),
+])
+def test_in_seconds(scheduled, capsys, duration, text):
+    assert cli.main(["in", duration]) == 0
+    assert text in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("duration", ["1:2:3", "abc", "1:60"])
+def test_in_invalid(scheduled, duration):
+    with pytest.raises(SystemExit):
+        cli.main(["in", duration])
+    assert scheduled == []
+
+
+def test_schedule_failure(monkeypatch, capsys):
+    monkeypatch.setattr(cli, "schedule_shutdown", lambda deadline: False)
+    assert cli.main(["in", "10"]) == 1
+    assert "Error executing shutdown command" in capsys.readouterr().err
+
+
+def test_status_none(monkeypatch, capsys):
+    monkeypatch.setattr(schedule, "read_scheduled_shutdown", lambda: None)
+    assert cli.main(["status"]) == 0
+    assert capsys.readouterr().out == "No shutdown scheduled.\n"
+    assert cli.main(["--language", "de", "status"]) == 0
+    assert capsys.readouterr().out == "Kein Shutdown geplant.\n"
+
+
+def test_status_pending(monkeypatch, capsys):
+    deadline = datetime.now() + timedelta(hours=1, minutes=30, seconds=30)
+    monkeypatch.setattr(schedule, "read_scheduled_shutdown", lambda: deadline)
+    assert cli.main(["status"]) == 0
+    out = capsys.readouterr().out
+    assert out.startswith("Shutdown scheduled for ")
+    assert "(in one hour and 30 minutes)" in out
+
+
+def test_status_reads_systemd_file(tmp_path):
+    deadline = datetime(2099, 1, 2, 23, 15)
+    path = tmp_path / "scheduled"
+    path.write_text(f"USEC={int(deadline.timestamp() * 1000000)}\nWARN_WALL=1\nMODE=poweroff\n")
+    assert schedule.read_scheduled_shutdown(str(path)) == deadline
+    path.write_text(f"USEC={int(deadline.timestamp() * 1000000)}\nMODE=reboot\n")
+    assert schedule.read_scheduled_shutdown(str(path)) is None
@@ -0,0 +1,32 @@
+# clockout.clock: the clock-change timerfd, natively and through ctypes
+import ctypes
+import os
+
+import pytest
+
+from clockout import clock, libc
+
+
+@pytest.mark.parametrize("native", [True, False])
+def test_clock_watch(monkeypatch, native):
+    if not native:
+        # The ctypes binding, also on Pythons that have os.timerfd_*
+        monkeypatch.delattr(os, "timerfd_create", raising=False)
+        monkeypatch.delattr(os, "timerfd_settime", raising=False)
+    elif not hasattr(os, "timerfd_create"):
+        pytest.skip("os.timerfd_create needs Python 3.13")
+    fd = clock.open_clock_watch()
+    assert fd is not None
+    try:
+        # Armed years ahead and the clock was not set: nothing to read
+        with pytest.raises(BlockingIOError):
+            os.read(fd, 8)
+        clock.arm_clock_watch(fd)
+        with pytest.raises(BlockingIOError):
+            os.read(fd, 8)
+        # Relative time left, read back as struct itimerspec
+        spec = (ctypes.c_long * 4)()
+        assert libc.load_libc().timerfd_gettime(fd, spec) == 0
+        assert abs(spec[2] - 10 * 365 * 86400) < 60
+    finally:
+        os.close(fd)
@@ -0,0 +1,121 @@
+# clockout.controller with stand-ins for the widgets: it only calls a few
+# methods on them, so no display is needed, only GLib
+import os
+import subprocess
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("gi")
+
+from clockout import controller, texts
+
+
+class Label:
+    def __init__(self):
+        self.text = ""
+        self.visible = True
+
+    def set_text(self, text):
+        self.text = text
+
+    def show(self):
+        self.visible = True
+
+    def hide(self):
+        self.visible = False
+
+
+class Check:
+    def __init__(self):
+        self.active = False
+
+    def get_active(self):
+        return self.active
+
+    def set_active(self, active):
+        self.active = active
+
+
+@pytest.fixture
+def shutdown(fake_commands, monkeypatch, run_until):
+    # No D-Bus at all: logind and notifications fall back to the fake commands
+    monkeypatch.setenv("DBUS_SYSTEM_BUS_ADDRESS", "unix:path=/nonexistent")
+    monkeypatch.setenv("DBUS_SESSION_BUS_ADDRESS", "unix:path=/nonexistent")
+    shutdown = controller.ShutdownController("en_US", Label(), Check())
+    yield shutdown
+    shutdown.stop_trigger()
+    shutdown.scheduler.cancel()
+    # Nothing may be left queued to run during the next test
+    done = []
+    shutdown.scheduler.after_commands(lambda: done.append(True))
+    run_until(lambda: done)
+
+
+def test_schedule_by_duration(shutdown, run_until):
+    shutdown.schedule("duration", "90")
+    run_until(lambda: shutdown.status_text)
+    deadline = shutdown.deadline.as_datetime()
+    assert shutdown.status_text == texts.format_datetime_string(deadline, datetime.now(), "en_US")
+    assert shutdown.scheduler.shutdown_scheduled
+    assert not shutdown.deadline.follows_wall_clock
+
+
+def test_invalid_input_cancels(shutdown, run_until):
+    shutdown.schedule("time", "23:59")
+    run_until(lambda: shutdown.scheduler.shutdown_scheduled)
+    shutdown.schedule("time", "25:99")
+    assert shutdown.status_text == "❌ Shutdown canceled!\n❌ Invalid input!"
+    assert not shutdown.scheduler.shutdown_scheduled
+    assert shutdown.deadline is None
+
+
+def test_trigger_fires(shutdown, run_until):
+    process = subprocess.Popen(["sleep", "30"])
+    shutdown.schedule("trigger", str(process.pid))
+    assert shutdown.status_text == "⏳ Waiting for 1 process to exit."
+    assert not shutdown.scheduler.shutdown_scheduled
+    process.kill()
+    process.wait()
+    run_until(lambda: shutdown.scheduler.shutdown_scheduled and shutdown.status_text.startswith("✅"))
+    assert shutdown.status_text == "✅ Shutdown scheduled in one minute."
+
+
+def test_idle_trigger_without_logind(shutdown, run_until):
+    # The idle watch fails only once it tries to reach logind
+    shutdown.schedule("trigger", "idle 15 min")
+    assert shutdown.status_text.startswith("⏳")
+    run_until(lambda: shutdown.status_text.startswith("❌"))
+    assert shutdown.status_text == "❌ Trigger failed!"
+    assert shutdown.trigger_watch is None
+
+
+def test_stop_clock_watch(shutdown):
+    shutdown.start()
+    fd = shutdown.clock_watch_fd
+    assert fd is not None and shutdown.clock_watch_id
+    shutdown.stop_clock_watch()
+    assert shutdown.clock_watch_fd is None and shutdown.clock_watch_id is None
+    with pytest.raises(OSError):
+        os.fstat(fd)
+
+
+def test_preview_returns_to_status(shutdown):
+    shutdown.set_status("✅ Shutdown scheduled for 22:00.")
+    shutdown.show_preview("duration", "30")
+    assert shutdown.label_status.text.startswith("→ ")
+    assert shutdown.status_text == "✅ Shutdown scheduled for 22:00."
+    shutdown.show_preview("duration", "soon")
+    assert shutdown.label_status.text == "✅ Shutdown scheduled for 22:00."
+
+
+def test_restore(shutdown):
+    deadline = datetime.fromtimestamp(datetime.now().timestamp() + 600)
+    shutdown.restore_shutdown(deadline, True)
+    assert shutdown.check_keep.active
+    assert shutdown.scheduler.timer_scheduled
+    assert shutdown.status_text == texts.format_datetime_string(deadline, datetime.now(), "en_US")
+    # Only once
+    shutdown.check_keep.active = False
+    shutdown.restore_shutdown(deadline, True)
+    assert not shutdown.check_keep.active
@@ -0,0 +1,375 @@
+# clockout.backend against fake D-Bus services on a private dbus-daemon,
+# which stands in for both the system and the session bus
+import json
+import shutil
+import subprocess
+import time
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("gi")
+if shutil.which("dbus-daemon") is None:
+    pytest.skip("needs dbus-daemon", allow_module_level=True)
+
+from gi.repository import GLib, Gio
+
+from clockout import backend, schedule, triggers
+
+BUS_CONFIG = """<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <listen>unix:dir={directory}</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow eavesdrop="true"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+"""
+
+LOGIND_XML = """<node>
+  <interface name="org.freedesktop.login1.Manager">
+    <method name="ScheduleShutdown">
+      <arg type="s" direction="in"/>
+      <arg type="t" direction="in"/>
+    </method>
+    <method name="CancelScheduledShutdown">
+      <arg type="b" direction="out"/>
+    </method>
+    <method name="GetSession">
+      <arg type="s" direction="in"/>
+      <arg type="o" direction="out"/>
+    </method>
+  </interface>
+</node>"""
+
+SESSION_PATH = "/org/freedesktop/login1/session/_31"
+SESSION_XML = """<node>
+  <interface name="org.freedesktop.login1.Session">
+    <property name="IdleHint" type="b" access="read"/>
+    <property name="IdleSinceHintMonotonic" type="t" access="read"/>
+  </interface>
+</node>"""
+
+NOTIFICATIONS_XML = """<node>
+  <interface name="org.freedesktop.Notifications">
+    <method name="Notify">
+      <arg type="s" direction="in"/>
+      <arg type="u" direction="in"/>
+      <arg type="s" direction="in"/>
+      <arg type="s" direction="in"/>
+      <arg type="s" direction="in"/>
+      <arg type="as" direction="in"/>
+      <arg type="a{sv}" direction="in"/>
+      <arg type="i" direction="in"/>
+      <arg type="u" direction="out"/>
+    </method>
+  </interface>
+</node>"""
+
+DENIED = "org.freedesktop.DBus.Error.AccessDenied"
+
+
+@pytest.fixture(scope="module")
+def bus_address(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("bus")
+    config = directory / "bus.conf"
+    config.write_text(BUS_CONFIG.format(directory=directory))
+    daemon = subprocess.Popen(
+        ["dbus-daemon", "--nofork", "--print-address", f"--config-file={config}"],
+        stdout=subprocess.PIPE, text=True
+    )
+    address = daemon.stdout.readline().strip()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DBUS_SYSTEM_BUS_ADDRESS", address)
+        patch.setenv("DBUS_SESSION_BUS_ADDRESS", address)
+        # The shared connections must not take the test run down with them
+        # when the daemon goes away at the end
+        buses = [Gio.bus_get_sync(bus_type, None) for bus_type in (Gio.BusType.SYSTEM, Gio.BusType.SESSION)]
+        for bus in buses:
+            bus.set_exit_on_close(False)
+        yield address
+    daemon.terminate()
+    daemon.wait()
+
+
+class FakeService:
+    # Owns a name on its own connection and answers calls from replies:
+    # method name -> GLib.Variant, or a D-Bus error name to fail with.
+    # Properties are served from properties: name -> GLib.Variant
+    def __init__(self, address, name, path, xml):
+        self.connection = Gio.DBusConnection.new_for_address_sync(
+            address,
+            Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT | Gio.DBusConnectionFlags.MESSAGE_BUS_CONNECTION,
+            None, None
+        )
+        self.calls = []
+        self.replies = {}
+        self.properties = {}
+        self.add_object(path, xml)
+        self.connection.call_sync(
+            "org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus", "RequestName",
+            GLib.Variant("(su)", (name, 0)), GLib.VariantType("(u)"), Gio.DBusCallFlags.NONE, -1, None
+        )
+
+    def add_object(self, path, xml):
+        node = Gio.DBusNodeInfo.new_for_xml(xml)
+        self.connection.register_object(path, node.interfaces[0], self.on_method_call, self.on_get_property)
+
+    def emit_properties_changed(self, path, interface, changed):
+        self.connection.emit_signal(
+            None, path, "org.freedesktop.DBus.Properties", "PropertiesChanged",
+            GLib.Variant("(sa{sv}as)", (interface, changed, []))
+        )
+
+    def on_get_property(self, connection, sender, path, interface, name):
+        return self.properties[name]
+
+    def on_method_call(self, connection, sender, path, interface, method, parameters, invocation):
+        self.calls.append((method, parameters.unpack()))
+        reply = self.replies.get(method)
+        if isinstance(reply, str):
+            invocation.return_dbus_error(reply, "Refused by the test")
+        else:
+            invocation.return_value(reply)
+
+    def close(self):
+        self.connection.close_sync(None)
+
+
+@pytest.fixture
+def logind(bus_address):
+    service = FakeService(bus_address, backend.LOGIND_NAME, backend.LOGIND_PATH, LOGIND_XML)
+    service.replies["CancelScheduledShutdown"] = GLib.Variant("(b)", (True,))
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def notifications(bus_address):
+    service = FakeService(bus_address, backend.NOTIFICATIONS_NAME, backend.NOTIFICATIONS_PATH, NOTIFICATIONS_XML)
+    service.replies["Notify"] = GLib.Variant("(u)", (7,))
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def session(logind):
+    # The caller's session, active until a test says otherwise
+    logind.replies["GetSession"] = GLib.Variant("(o)", (SESSION_PATH,))
+    logind.add_object(SESSION_PATH, SESSION_XML)
+    logind.properties["IdleHint"] = GLib.Variant("b", False)
+    logind.properties["IdleSinceHintMonotonic"] = GLib.Variant("t", 0)
+    return logind
+
+
+def read_log(state, name):
+    path = state / f"{name}.log"
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+def deadline_in(seconds):
+    return datetime.fromtimestamp(time.time() + seconds)
+
+
+def settle(scheduler, run_until):
+    done = []
+    scheduler.after_commands(lambda: done.append(True))
+    run_until(lambda: done)
+
+
+def monotonic_usec(seconds_ago):
+    # IdleSinceHintMonotonic is CLOCK_MONOTONIC, like time.monotonic()
+    return int((time.monotonic() - seconds_ago) * 1000000)
+
+
+def start_idle_watch(hold, run_until):
+    # Returns (watch, fired, errors) once the watch is fully set up, has
+    # failed or has already fired
+    fired, errors = [], []
+    watch = triggers.UserIdleWatch(hold, lambda: fired.append(True), errors.append)
+    # logind's PropertiesChanged plus both screensaver interfaces
+    run_until(lambda: len(watch.subscriptions) == 3 or errors or fired)
+    return watch, fired, errors
+
+
+def test_schedule_through_logind(logind, fake_commands, run_until):
+    deadline = deadline_in(600)
+    results = []
+    scheduler = backend.Scheduler()
+    scheduler.schedule(deadline, False, results.append)
+    run_until(lambda: results)
+    assert results == [None]
+    assert scheduler.shutdown_scheduled and not scheduler.timer_scheduled
+    assert logind.calls == [("ScheduleShutdown", ("poweroff", schedule.logind_usec(deadline)))]
+    assert read_log(fake_commands, "shutdown") == []
+
+
+def test_cancel_through_logind(logind, fake_commands, run_until):
+    scheduler = backend.Scheduler()
+    scheduler.schedule(deadline_in(600), False)
+    results = []
+    scheduler.cancel(results.append)
+    run_until(lambda: results)
+    assert results == [None]
+    assert not scheduler.shutdown_scheduled
+    assert [method for method, _ in logind.calls] == ["ScheduleShutdown", "CancelScheduledShutdown"]
+    assert read_log(fake_commands, "shutdown") == []
+
+
+def test_sleep_watch_connects_in_the_background(logind, run_until):
+    resumed = []
+    scheduler = backend.Scheduler()
+    scheduler.watch_sleep(lambda: resumed.append(True))
+    # Connecting is left to the main loop
+    assert Gio.BusType.SYSTEM not in scheduler.buses
+    run_until(lambda: Gio.BusType.SYSTEM in scheduler.buses)
+    # A round trip makes sure the bus has the signal match by now
+    scheduler.buses[Gio.BusType.SYSTEM].call_sync(
+        "org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus", "GetId",
+        None, None, Gio.DBusCallFlags.NONE, -1, None
+    )
+    logind.connection.emit_signal(
+        None, backend.LOGIND_PATH, backend.LOGIND_INTERFACE, "PrepareForSleep", GLib.Variant("(b)", (False,))
+    )
+    run_until(lambda: resumed)
+
+
+def test_schedule_falls_back_without_logind(bus_address, fake_commands, run_until):
+    # Two minutes and a bit: the bit is waited out, then shutdown gets +2
+    results = []
+    scheduler = backend.Scheduler()
+    scheduler.schedule(deadline_in(120.5), False, results.append)
+    run_until(lambda: results)
+    assert results == [None]
+    run_until(lambda: read_log(fake_commands, "shutdown"))
+    assert read_log(fake_commands, "shutdown") == [["-h", "+2"]]
+
+
+def test_postpone_falls_back_without_logind(bus_address, fake_commands, run_until):
+    scheduler = backend.Scheduler()
+    scheduler.schedule(deadline_in(120.3), False)
+    run_until(lambda: read_log(fake_commands, "shutdown"))
+    # The old "shutdown -h" is canceled before the new deadline's odd
+    # seconds are waited out, so it can't fire at the old time meanwhile
+    scheduler.reschedule(deadline_in(240.5))
+    run_until(lambda: len(read_log(fake_commands, "shutdown")) > 1)
+    assert read_log(fake_commands, "shutdown") == [["-h", "+2"], ["-c"]]
+    run_until(lambda: len(read_log(fake_commands, "shutdown")) > 2)
+    assert read_log(fake_commands, "shutdown") == [["-h", "+2"], ["-c"], ["-h", "+4"]]
+
+
+def test_cancel_falls_back_without_logind(bus_address, fake_commands, run_until):
+    results = []
+    scheduler = backend.Scheduler()
+    scheduler.cancel(results.append)
+    run_until(lambda: results)
+    assert results == [None]
+    assert read_log(fake_commands, "shutdown") == [["-c"]]
+
+
+def test_denied_does_not_fall_back(logind, fake_commands, run_until):
+    logind.replies["ScheduleShutdown"] = DENIED
+    results = []
+    scheduler = backend.Scheduler()
+    scheduler.schedule(deadline_in(120.5), False, results.append)
+    run_until(lambda: results)
+    assert results[0] and not scheduler.shutdown_scheduled
+    settle(scheduler, run_until)
+    assert read_log(fake_commands, "shutdown") == []
+
+
+def test_notification_replaced_in_place(notifications, fake_commands, run_until):
+    results = []
+    scheduler = backend.Scheduler()
+    scheduler.notify("Shutdown scheduled", "At 22:00", results.append)
+    scheduler.notify("Shutdown scheduled", "At 22:30", results.append)
+    run_until(lambda: len(results) == 2)
+    assert results == [None, None]
+    # The second bubble replaces the first through its id
+    assert [call[1][1] for call in notifications.calls] == [0, 7]
+    assert [call[1][4] for call in notifications.calls] == ["At 22:00", "At 22:30"]
+    assert read_log(fake_commands, "notify-send") == []
+
+
+def test_notify_falls_back_without_service(bus_address, fake_commands, run_until):
+    results = []
+    scheduler = backend.Scheduler()
+    scheduler.notify("Shutdown canceled", "", results.append)
+    run_until(lambda: results)
+    assert results == [None]
+    assert read_log(fake_commands, "notify-send") == [["Shutdown canceled", ""]]
+
+
+def test_notify_error_does_not_fall_back(notifications, fake_commands, run_until):
+    notifications.replies["Notify"] = "org.freedesktop.DBus.Error.Failed"
+    results = []
+    scheduler = backend.Scheduler()
+    scheduler.notify("Error", "Could not schedule", results.append)
+    run_until(lambda: results)
+    assert results[0]
+    assert read_log(fake_commands, "notify-send") == []
+
+
+@pytest.mark.parametrize("error, missing", [
+    (Gio.DBusError.new_for_dbus_error("org.freedesktop.DBus.Error.ServiceUnknown", "gone"), True),
+    (Gio.DBusError.new_for_dbus_error("org.freedesktop.DBus.Error.UnknownMethod", "gone"), True),
+    (Gio.DBusError.new_for_dbus_error(DENIED, "no"), False),
+    (Gio.DBusError.new_for_dbus_error("org.freedesktop.DBus.Error.InteractiveAuthorizationRequired", "no"), False),
+    # Waiting on a polkit prompt, or the bus went away mid-call
+    (GLib.Error.new_literal(Gio.io_error_quark(), "Timeout was reached", Gio.IOErrorEnum.TIMED_OUT), False),
+    (GLib.Error.new_literal(Gio.io_error_quark(), "Connection is closed", Gio.IOErrorEnum.CLOSED), False),
+])
+def test_is_service_missing(error, missing):
+    assert backend.Scheduler().is_service_missing(error) is missing
+
+
+def test_user_idle_fires_for_long_idle_session(session, run_until):
+    session.properties["IdleHint"] = GLib.Variant("b", True)
+    session.properties["IdleSinceHintMonotonic"] = GLib.Variant("t", monotonic_usec(120))
+    watch, fired, errors = start_idle_watch(60, run_until)
+    run_until(lambda: fired)
+    assert not errors
+    assert watch.subscriptions == []
+    assert ("GetSession", ("auto",)) in session.calls
+
+
+def test_user_idle_follows_property_changes(session, run_until):
+    watch, fired, errors = start_idle_watch(1, run_until)
+    assert not errors and watch.idle.remaining() is None
+    session.emit_properties_changed(SESSION_PATH, triggers.SESSION_INTERFACE, {
+        "IdleHint": GLib.Variant("b", True),
+        "IdleSinceHintMonotonic": GLib.Variant("t", monotonic_usec(0)),
+    })
+    run_until(lambda: fired)
+
+
+def test_user_idle_activity_disarms(session, run_until):
+    session.properties["IdleHint"] = GLib.Variant("b", True)
+    session.properties["IdleSinceHintMonotonic"] = GLib.Variant("t", monotonic_usec(120))
+    watch, fired, errors = start_idle_watch(3600, run_until)
+    assert watch.timeout_id
+    session.emit_properties_changed(SESSION_PATH, triggers.SESSION_INTERFACE, {"IdleHint": GLib.Variant("b", False)})
+    run_until(lambda: watch.timeout_id is None)
+    assert watch.idle.remaining() is None
+    watch.stop()
+    assert not fired
+
+
+def test_user_idle_reports_missing_logind(bus_address, run_until):
+    watch, fired, errors = start_idle_watch(60, run_until)
+    assert errors and not fired
+    assert watch.subscriptions == []
+
+
+def test_user_idle_stopped_during_setup(session, run_until):
+    fired, errors = [], []
+    watch = triggers.UserIdleWatch(60, lambda: fired.append(True), errors.append)
+    watch.stop()
+    waited = []
+    GLib.timeout_add(200, lambda: waited.append(True))
+    run_until(lambda: waited)
+    assert not errors and not fired
+    assert watch.subscriptions == []
@@ -0,0 +1,21 @@
+# clockout.imaging: inverting RGB(A) pixel data for dark themes
+import pytest
+
+from clockout import imaging
+
+
+@pytest.mark.parametrize("n_channels, has_alpha, padding", [(4, True, 0), (3, False, 0), (3, False, 3), (4, True, 8)])
+def test_invert_pixels(n_channels, has_alpha, padding):
+    width, height = 5, 4
+    rowstride = width * n_channels + padding
+    pixels = bytes(range(256)) * (rowstride * height // 256 + 1)
+    pixels = pixels[:rowstride * (height - 1) + width * n_channels]
+    inverted = imaging.invert_pixels(pixels, width, rowstride, n_channels, has_alpha)
+    assert len(inverted) == len(pixels)
+    for offset, (old, new) in enumerate(zip(pixels, inverted)):
+        column = offset % rowstride
+        if column >= width * n_channels or column % n_channels == 3:
+            # Padding and alpha stay as they were
+            assert new == old
+        else:
+            assert new == 255 - old
@@ -0,0 +1,24 @@
+# clockout.inotify: the dir trigger on a real directory tree
+from clockout import inotify
+
+
+def test_directory_quiet_tracks_partials(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "file.part").touch()
+    quiet = inotify.DirectoryQuiet(str(tmp_path), 60)
+    try:
+        assert quiet.partials == {str(tmp_path / "a" / "file.part")}
+        # A new directory is watched as soon as it appears
+        (tmp_path / "b" / "c").mkdir(parents=True)
+        quiet.read_events()
+        (tmp_path / "b" / "c" / "x.crdownload").touch()
+        quiet.read_events()
+        assert str(tmp_path / "b" / "c" / "x.crdownload") in quiet.partials
+        (tmp_path / "a" / "file.part").rename(tmp_path / "a" / "file")
+        (tmp_path / "b" / "c" / "x.crdownload").unlink()
+        quiet.read_events(now=1000.0)
+        assert quiet.partials == set()
+        assert quiet.remaining(now=1030.0) == 30
+        assert quiet.remaining(now=1060.0) == 0
+    finally:
+        quiet.close()
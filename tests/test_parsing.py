@@ -0,0 +1,13 @@
+# clockout.parsing: the trigger syntax
+from clockout import inotify, parsing
+
+
+def test_directory_trigger_resolves_symlinks(tmp_path):
+    target = tmp_path / "downloads"
+    target.mkdir()
+    link = tmp_path / "link"
+    link.symlink_to(target)
+    trigger = parsing.parse_trigger(f"dir {link} for 3 min", None)
+    assert trigger == ("directory", str(target), 180)
+    # Arms, although the watches are added with IN_DONT_FOLLOW
+    inotify.DirectoryQuiet(trigger[1], trigger[2]).close()
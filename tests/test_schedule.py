@@ -0,0 +1,58 @@
+# clockout.schedule: the shutdown command's handoff, logind's deadline and
+# the systemd timer commands
+from datetime import datetime
+
+import pytest
+
+from clockout import schedule
+
+
+@pytest.mark.parametrize("seconds", [0, 0.4, 1, 59.5, 60, 61, 90.25, 3599.999, 8 * 3600 + 17])
+def test_handoff_has_no_drift(seconds):
+    # The wait plus "shutdown +N" lands on the requested deadline
+    now = 1800000000.123456
+    deadline = datetime.fromtimestamp(now + seconds)
+    wait_ms, minutes = schedule.split_handoff(deadline, now)
+    assert 0 <= wait_ms < 60000
+    handed_off = now + wait_ms / 1000 + minutes * 60
+    assert abs(handed_off - deadline.timestamp()) < 0.001
+
+
+def test_handoff_of_past_deadline_is_immediate():
+    now = 1800000000.0
+    assert schedule.split_handoff(datetime.fromtimestamp(now - 30), now) == (0, 0)
+
+
+def test_logind_usec_round_trip():
+    deadline = datetime(2099, 1, 2, 23, 15, 7, 250000)
+    usec = schedule.logind_usec(deadline)
+    assert usec % 1000000 == 250000
+    assert datetime.fromtimestamp(usec / 1000000) == deadline
+
+
+def test_timer_schedule_command():
+    deadline = datetime(2099, 1, 2, 23, 15, 7)
+    assert schedule.timer_schedule_command(deadline) == [
+        "systemd-run", "--user", "--unit=clockout-shutdown",
+        "--on-calendar=2099-01-02 23:15:07",
+        "--timer-property=AccuracySec=1s",
+        "systemctl", "poweroff",
+    ]
+
+
+def test_timer_cancel_and_query_commands():
+    assert schedule.timer_cancel_command() == ["systemctl", "--user", "stop", "clockout-shutdown.timer"]
+    assert schedule.timer_query_command() == [
+        "systemctl", "--user", "show", "clockout-shutdown.timer",
+        "--property=NextElapseUSecRealtime", "--timestamp=unix", "--value",
+    ]
+
+
+def test_parse_timer_elapse():
+    deadline = datetime(2099, 1, 2, 23, 15)
+    assert schedule.parse_timer_elapse(f"@{int(deadline.timestamp())}\n") == deadline
+
+
+@pytest.mark.parametrize("output", ["", "\n", "n/a\n", "@\n", "@abc\n", "0\n"])
+def test_parse_timer_elapse_without_timer(output):
+    assert schedule.parse_timer_elapse(output) is None
@@ -0,0 +1,43 @@
+# clockout.session: the idle state behind the idle trigger
+import time
+
+from clockout import session
+
+
+def test_user_idle_needs_an_idle_source():
+    idle = session.UserIdle(600)
+    assert idle.remaining(1000.0) is None
+    idle.update("logind", False)
+    assert idle.remaining(1000.0) is None
+
+
+def test_user_idle_counts_from_earliest_source():
+    idle = session.UserIdle(600)
+    idle.update("logind", True, 1000.0)
+    idle.update("org.freedesktop.ScreenSaver", True, 1200.0)
+    assert idle.remaining(1300.0) == 300.0
+    # The screensaver alone is still idle, but only since later
+    idle.update("logind", False)
+    assert idle.remaining(1300.0) == 500.0
+    idle.update("org.freedesktop.ScreenSaver", False)
+    assert idle.remaining(1300.0) is None
+
+
+def test_user_idle_keeps_its_start():
+    idle = session.UserIdle(60)
+    idle.update("logind", True, 1000.0)
+    # A repeated report without a time doesn't restart the hold...
+    idle.update("logind", True)
+    assert idle.remaining(1030.0) == 30.0
+    # ...one with a time corrects it
+    idle.update("logind", True, 1010.0)
+    assert idle.remaining(1030.0) == 40.0
+    assert idle.remaining(5000.0) == 0.0
+
+
+def test_user_idle_without_time_starts_now():
+    idle = session.UserIdle(60)
+    before = time.monotonic()
+    idle.update("org.gnome.ScreenSaver", True)
+    assert 59.0 < idle.remaining() <= 60.0
+    assert idle.since["org.gnome.ScreenSaver"] >= before
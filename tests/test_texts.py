@@ -0,0 +1,67 @@
+# clockout.texts: the same wording for every window, per language
+from datetime import datetime
+
+import pytest
+
+from clockout import texts
+
+NOW = datetime(2099, 1, 1, 12, 0)
+
+
+@pytest.mark.parametrize("language", ["en_EU", "de"])
+def test_every_language_has_every_text(language):
+    assert texts.TEXTS[language].keys() == texts.TEXTS["en_US"].keys()
+
+
+def test_time_string():
+    assert texts.format_time_string(60, "en_US") == "✅ Shutdown scheduled in one minute."
+    assert texts.format_time_string(3600, "en_US") == "✅ Shutdown scheduled in one hour."
+    assert texts.format_time_string(9000, "en_US") == "✅ Shutdown scheduled in 2 hours\nand 30 minutes."
+    assert texts.format_time_string(3660, "de") == "✅ Shutdown in einer Stunde\nund einer Minute geplant."
+
+
+def test_datetime_string():
+    assert texts.format_datetime_string(datetime(2099, 1, 1, 23, 15), NOW, "en_US") == "✅ Shutdown scheduled for 23:15."
+    assert texts.format_datetime_string(datetime(2099, 1, 2, 23, 15), NOW, "de") == "✅ Shutdown erfolgt \nmorgen um 23:15 Uhr."
+    assert texts.format_datetime_string(datetime(2099, 2, 3, 23, 15), NOW, "en_EU") == "✅ Shutdown scheduled for \n03.02.2099 at 23:15."
+
+
+def test_preview():
+    deadline = datetime(2099, 2, 3, 23, 15)
+    assert texts.format_preview(deadline, NOW, "en_US") == "→ 02/03/2099 at 23:15"
+    assert texts.format_preview(deadline, NOW, "en_EU") == "→ 03.02.2099 at 23:15"
+    assert texts.format_preview(deadline, NOW, "de") == "→ am 03.02.2099 um 23:15 Uhr"
+
+
+def test_describe_trigger():
+    assert texts.describe_trigger(("process", [1]), "en_US") == "1 process to exit"
+    assert texts.describe_trigger(("process", [1, 2]), "de") == "2 Prozesse"
+    assert texts.describe_trigger(("network", None, 50000, 120), "en_US") == "network to stay below 50 KB/s for 2 min"
+    assert texts.describe_trigger(("disk", ["sda"], 5000000, 60, True), "de") == "sda unter 5 MB/s für 1 min"
+    assert texts.describe_trigger(("idle", 900), "en_EU") == "15 min without user activity"
+    assert texts.describe_trigger(("directory", "/tmp", 180), "de") == "Ruhe in /tmp für 3 min"
+
+
+def test_locale_language():
+    assert texts.locale_language({}) == "en_US"
+    assert texts.locale_language({"LANG": "de_AT.UTF-8"}) == "de"
+    assert texts.locale_language({"LANG": "en_GB.UTF-8"}) == "en_EU"
+    assert texts.locale_language({"LANG": "de_DE.UTF-8", "LC_ALL": "en_US.UTF-8"}) == "en_US"
+
+
+@pytest.mark.parametrize("seconds, text", [
+    (45, "45 seconds"),
+    (90, "one minute and 30 seconds"),
+    (59 * 60 + 30, "59 minutes and 30 seconds"),
+    (60, "one minute"),
+    (0, "0 seconds"),
+    (3600 + 30, "one hour"),
+    (2 * 3600 + 5 * 60 + 30, "2 hours and 5 minutes"),
+])
+def test_duration(seconds, text):
+    assert texts.format_duration(seconds, "en_US") == text
+
+
+def test_duration_under_a_minute():
+    assert texts.format_time_string(45, "en_US") == "✅ Shutdown scheduled in 45 seconds."
+    assert texts.format_time_string(90, "de") == "✅ Shutdown in einer Minute\nund 30 Sekunden geplant."
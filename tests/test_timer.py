@@ -0,0 +1,88 @@
+# The systemd timer mode of backend.Scheduler against the fake
+# systemd-run/systemctl in tests/fakebin
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("gi")
+
+from clockout import backend, schedule
+
+
+def read_log(state):
+    # Every systemd-run and systemctl call, in order
+    path = state / "systemd.log"
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+def deadline_in(minutes):
+    return (datetime.now() + timedelta(minutes=minutes)).replace(microsecond=0)
+
+
+def on_calendar(deadline):
+    return f"--on-calendar={deadline:%Y-%m-%d %H:%M:%S}"
+
+
+@pytest.fixture
+def scheduler(fake_commands):
+    return backend.Scheduler()
+
+
+def settle(scheduler, run_until):
+    done = []
+    scheduler.after_commands(lambda: done.append(True))
+    run_until(lambda: done)
+
+
+def test_schedule(scheduler, fake_commands, run_until):
+    deadline = deadline_in(30)
+    results = []
+    scheduler.schedule(deadline, True, results.append)
+    run_until(lambda: results)
+    assert results == [None]
+    assert scheduler.shutdown_scheduled and scheduler.timer_scheduled
+    # A leftover timer is stopped first, then the new one is started
+    assert read_log(fake_commands) == [schedule.timer_cancel_command(), schedule.timer_schedule_command(deadline)]
+    started = read_log(fake_commands)[-1]
+    assert f"--unit={schedule.TIMER_UNIT}" in started
+    assert on_calendar(deadline) in started
+
+
+def test_reschedule_replaces_timer(scheduler, fake_commands, run_until):
+    scheduler.schedule(deadline_in(30), True)
+    settle(scheduler, run_until)
+    later = deadline_in(45)
+    scheduler.reschedule(later)
+    settle(scheduler, run_until)
+    # The running unit has to be stopped before its name can be reused
+    assert read_log(fake_commands)[-2:] == [schedule.timer_cancel_command(), schedule.timer_schedule_command(later)]
+    assert on_calendar(later) in read_log(fake_commands)[-1]
+
+
+def test_cancel(scheduler, fake_commands, run_until):
+    scheduler.schedule(deadline_in(30), True)
+    settle(scheduler, run_until)
+    results = []
+    scheduler.cancel(results.append)
+    run_until(lambda: results)
+    assert results == [None]
+    assert read_log(fake_commands)[-1] == schedule.timer_cancel_command()
+    assert not scheduler.shutdown_scheduled and not scheduler.timer_scheduled
+    assert not (fake_commands / "poweroff").exists()
+
+
+def test_restore_round_trip(scheduler, fake_commands, run_until):
+    deadline = deadline_in(30)
+    scheduler.schedule(deadline, True)
+    settle(scheduler, run_until)
+
+    # A later run finds the timer through the query command and adopts it
+    found = []
+    reopened = backend.Scheduler()
+    reopened.query_timer(found.append)
+    settle(reopened, run_until)
+    assert found == [deadline]
+    assert read_log(fake_commands)[-1] == schedule.timer_query_command()
+    assert reopened.restore(deadline, True)
+    assert reopened.timer_scheduled